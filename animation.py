@@ -0,0 +1,180 @@
+"""
+Display animations
+
+This module implements transitions and looping animations for the LED
+display. All frames of an animation are precomputed once as a single
+(frames, height, width, 3) uint8 array and kept in a bounded cache, so
+playback only has to index into the array at a fixed frame rate.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from collections import OrderedDict
+
+import numpy as np
+
+def wipe(from_frame, to_frame, steps):
+    """Precompute a left to right wipe between two frames."""
+
+    width = from_frame.shape[1]
+    edges = np.arange(1, steps + 1) * width // steps
+    mask = np.arange(width)[None, None, :, None] < edges[:, None, None, None]
+    return np.where(mask, to_frame[None], from_frame[None])
+
+def fade(from_frame, to_frame, steps):
+    """Precompute a cross fade between two frames."""
+
+    alpha = (np.arange(1, steps + 1) / steps)[:, None, None, None]
+    frames = from_frame[None] * (1.0 - alpha) + to_frame[None] * alpha
+    return np.rint(frames).astype(np.uint8)
+
+def wave(frame, steps, amplitude=2, wavelength=64):
+    """Precompute one period of a frame waving like a flag."""
+
+    height, width = frame.shape[:2]
+    phase = np.arange(steps)[:, None] / steps
+    x = np.arange(width)[None, :]
+    shift = np.rint(amplitude * np.sin(2.0 * np.pi * (x / wavelength - phase))).astype(int)
+
+    rows = np.arange(height)[None, :, None] - shift[:, None, :]
+    inside = (rows >= 0) & (rows < height)
+    cols = np.broadcast_to(x[:, None, :], rows.shape)
+
+    frames = frame[np.clip(rows, 0, height - 1), cols]
+    frames[~inside] = 0
+    return frames
+
+def pulse(frame, steps, low=0.4):
+    """Precompute one period of a frame pulsing in brightness."""
+
+    phase = np.arange(steps) / steps
+    scale = low + (1.0 - low) * 0.5 * (1.0 + np.cos(2.0 * np.pi * phase))
+    frames = frame[None] * scale[:, None, None, None]
+    return np.rint(frames).astype(np.uint8)
+
+EFFECTS = {
+    "wipe": wipe,
+    "fade": fade,
+}
+
+class Animation:
+    """Precomputed sequence of frames"""
+
+    def __init__(self, frames, fps, loop=False):
+        """Class constructor"""
+
+        self.frames = frames
+        self.fps = fps
+        self.loop = loop
+
+    def __len__(self):
+        return len(self.frames)
+
+class AnimationCache:
+    """Bounded least recently used cache of precomputed animations"""
+
+    def __init__(self, max_size=16):
+        """Class constructor"""
+
+        self.max_size = max_size
+        self._animations = OrderedDict()
+
+    def get(self, key, builder):
+        """Return the animation for key, building it with builder() if missing."""
+
+        animation = self._animations.get(key)
+
+        if animation is None:
+            animation = builder()
+            self._animations[key] = animation
+            if len(self._animations) > self.max_size:
+                self._animations.popitem(last=False)
+        else:
+            self._animations.move_to_end(key)
+
+        return animation
+
+    def clear(self):
+        """Remove all cached animations."""
+
+        self._animations.clear()
+
+class Animator:
+    """Plays back precomputed animations at a fixed frame rate"""
+
+    def __init__(self, fps=50, cache_size=16):
+        """Class constructor"""
+
+        self.fps = fps
+        self.cache = AnimationCache(cache_size)
+        self.animation = None
+        self._start = 0.0
+
+    def transition(self, key, from_frame, to_frame, effect, duration=0.4):
+        """Return a cached transition animation between two frames."""
+
+        steps = max(int(duration * self.fps), 1)
+        return self.cache.get(("transition", effect) + key,
+            lambda: Animation(EFFECTS[effect](from_frame, to_frame, steps), self.fps))
+
+    def waving(self, key, frame, period=1.0):
+        """Return a cached looping wave animation of a frame."""
+
+        steps = max(int(period * self.fps), 1)
+        return self.cache.get(("wave",) + key,
+            lambda: Animation(wave(frame, steps), self.fps, loop=True))
+
+    def pulsing(self, key, frame, period=1.0):
+        """Return a cached looping pulse animation of a frame."""
+
+        steps = max(int(period * self.fps), 1)
+        return self.cache.get(("pulse",) + key,
+            lambda: Animation(pulse(frame, steps), self.fps, loop=True))
+
+    def play(self, animation, now):
+        """Start playing an animation unless it is already playing."""
+
+        if animation is not self.animation:
+            self.animation = animation
+            self._start = now
+
+    def stop(self):
+        """Stop the current animation."""
+
+        self.animation = None
+
+    @property
+    def active(self):
+        """True if an animation is currently playing."""
+
+        return self.animation is not None
+
+    def frame(self, now):
+        """Return the frame to show at time now or None if nothing is playing."""
+
+        if self.animation is None:
+            return None
+
+        index = int((now - self._start) * self.animation.fps)
+
+        if self.animation.loop:
+            index %= len(self.animation)
+        elif index >= len(self.animation):
+            self.animation = None
+            return None
+
+        return self.animation.frames[index]
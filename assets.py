@@ -0,0 +1,125 @@
+"""
+Image asset store
+
+This module converts uploaded images into raw RGB buffers of the panel
+size and stores them in a directory shared by the web-server and the
+display-server. Images are scaled, centred and gamma corrected once when
+they are uploaded. The display-server maps the raw files into memory,
+so showing an image is a single copy into the frame without any
+decoding or resizing in the render loop.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import re
+
+import numpy as np
+
+from PIL import Image, ImageOps
+
+NAME_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+def image_name(filename):
+    """Image name derived from an uploaded file name."""
+
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return re.sub(r"[^A-Za-z0-9_-]", "_", stem)[:64]
+
+def gamma_table(gamma):
+    """Lookup table mapping 8-bit sRGB values to LED intensities."""
+
+    return np.round(255.0 * (np.arange(256) / 255.0) ** gamma).astype(np.uint8)
+
+def prepare_image(source, width, height, gamma=2.2, background=(0, 0, 0)):
+    """Return an image file or stream as a gamma corrected (height, width, 3)
+    array. The image is scaled to fit the panel and centred on the
+    background colour."""
+
+    image = Image.open(source)
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGBA")
+    image = ImageOps.contain(image, (width, height), Image.LANCZOS)
+
+    panel = Image.new("RGB", (width, height), background)
+    panel.paste(image, ((width - image.width) // 2, (height - image.height) // 2), image)
+
+    return gamma_table(gamma)[np.asarray(panel)]
+
+class AssetStore:
+    """Directory of raw panel-sized RGB images mapped into memory"""
+
+    def __init__(self, directory, width, height):
+        """Class constructor"""
+
+        self.width = width
+        self.height = height
+        self.directory = os.path.join(directory, "%dx%d" % (width, height))
+        self.frame_size = width * height * 3
+
+        self._images = {}
+
+    def filename(self, name):
+        """Raw file of an image. Raises ValueError for invalid names."""
+
+        if not NAME_PATTERN.fullmatch(name or ""):
+            raise ValueError("Invalid image name: %r" % name)
+
+        return os.path.join(self.directory, name + ".rgb")
+
+    def save(self, name, frame):
+        """Store a (height, width, 3) frame. The file is replaced atomically
+        so the display never maps a partially written image."""
+
+        filename = self.filename(name)
+
+        if frame.shape != (self.height, self.width, 3):
+            raise ValueError("Image is %s, expected %dx%d" % (frame.shape, self.width, self.height))
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        temp = filename + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+        os.replace(temp, filename)
+
+        self.invalidate(name)
+
+    def invalidate(self, name):
+        """Drop the mapping of an image, so a replaced file is mapped again."""
+
+        self._images.pop(name, None)
+
+    def get(self, name):
+        """Return the memory mapped frame of an image or None if it is
+        missing. Mappings are kept until the image is invalidated."""
+
+        image = self._images.get(name)
+
+        if image is not None:
+            return image
+
+        try:
+            filename = self.filename(name)
+            if os.path.getsize(filename) != self.frame_size:
+                return None
+            image = np.memmap(filename, dtype=np.uint8, mode="r", shape=(self.height, self.width, 3))
+        except (OSError, ValueError):
+            return None
+
+        self._images[name] = image
+        return image
@@ -2,6 +2,8 @@
 
 import zmq
 
+from protocol import ARGUMENT_COMMANDS
+
 if __name__ == "__main__":
 
     context = zmq.Context()
@@ -13,7 +15,11 @@ if __name__ == "__main__":
     #  Socket to talk to server
     while True:
         msg = input("> ")
+        command, _, argument = msg.partition(" ")
         print("Sent message")
-        socket.send_string(msg)
+        if command in ARGUMENT_COMMANDS:
+            socket.send_multipart([command.encode("utf-8"), argument.encode("utf-8")])
+        else:
+            socket.send_string(msg)
         message = socket.recv_string()
         print("Message received: ", message)
@@ -0,0 +1,300 @@
+"""
+Frame compositor
+
+This module implements a NumPy based compositor for the LED display.
+Frames are built as (height, width, 3) uint8 arrays using vectorized
+slicing and are transferred to the matrix canvas in a single SetImage
+call instead of issuing one DrawLine call per row or pixel.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import numpy as np
+
+from PIL import Image
+
+REPLACEMENT_CHAR = 0xFFFD
+
+class BdfFont:
+    """Bitmap font read from a BDF file and rasterised to NumPy masks"""
+
+    def __init__(self, filename):
+        """Class constructor"""
+
+        self.filename = filename
+        self.height = 0
+        self.baseline = 0
+        self._glyphs = {}
+        self._masks = {}
+
+        self._load(filename)
+
+    def _load(self, filename):
+        """Parse glyph metrics and bitmaps from the BDF file."""
+
+        encoding = None
+        bbx = None
+        dwidth = 0
+        rows = None
+
+        with open(filename, "r", encoding="latin-1") as f:
+            for line in f:
+                items = line.split()
+                if not items:
+                    continue
+                key = items[0]
+                if rows is not None:
+                    if key == "ENDCHAR":
+                        if encoding is not None and encoding >= 0 and bbx is not None:
+                            self._glyphs[encoding] = (bbx, dwidth, rows)
+                        rows = None
+                    else:
+                        rows.append(key)
+                elif key == "FONTBOUNDINGBOX":
+                    self.height = int(items[2])
+                    self.baseline = self.height + int(items[4])
+                elif key == "STARTCHAR":
+                    encoding = None
+                    bbx = None
+                    dwidth = 0
+                elif key == "ENCODING":
+                    encoding = int(items[1])
+                elif key == "DWIDTH":
+                    dwidth = int(items[1])
+                elif key == "BBX":
+                    bbx = tuple(int(v) for v in items[1:5])
+                elif key == "BITMAP":
+                    rows = []
+
+    def glyph(self, codepoint):
+        """Return (mask, x_offset, y_offset, advance) for a codepoint."""
+
+        if codepoint in self._masks:
+            return self._masks[codepoint]
+
+        entry = self._glyphs.get(codepoint)
+        if entry is None:
+            entry = self._glyphs.get(REPLACEMENT_CHAR)
+        if entry is None:
+            self._masks[codepoint] = None
+            return None
+
+        (width, height, x_offset, y_offset), dwidth, rows = entry
+
+        if width > 0 and height > 0 and rows:
+            data = np.frombuffer(bytes.fromhex("".join(rows)), dtype=np.uint8)
+            bits = np.unpackbits(data.reshape(len(rows), -1), axis=1)
+            mask = bits[:height, :width].astype(bool)
+        else:
+            mask = np.zeros((0, 0), dtype=bool)
+
+        glyph = (mask, x_offset, y_offset, dwidth)
+        self._masks[codepoint] = glyph
+        return glyph
+
+    def text_width(self, text):
+        """Return the advance width of a text string in pixels."""
+
+        width = 0
+        for ch in text:
+            glyph = self.glyph(ord(ch))
+            if glyph is not None:
+                width += glyph[3]
+        return width
+
+    def ink_extent(self, text):
+        """Return (left, right, ascent, descent) of the lit pixels of a text
+        drawn with its origin at x = 0 on the baseline."""
+
+        left = right = None
+        ascent = descent = 0
+        x = 0
+
+        for ch in text:
+            glyph = self.glyph(ord(ch))
+            if glyph is None:
+                continue
+
+            mask, x_offset, y_offset, advance = glyph
+            rows = np.flatnonzero(mask.any(axis=1))
+            cols = np.flatnonzero(mask.any(axis=0))
+
+            if len(rows) > 0:
+                h = mask.shape[0]
+                gx = x + x_offset
+                left = gx + cols[0] if left is None else min(left, gx + cols[0])
+                right = gx + cols[-1] + 1 if right is None else max(right, gx + cols[-1] + 1)
+                ascent = max(ascent, h + y_offset - rows[0])
+                descent = max(descent, rows[-1] + 1 - h - y_offset)
+
+            x += advance
+
+        if left is None:
+            return (0, 0, 0, 0)
+
+        return (int(left), int(right), int(ascent), int(descent))
+
+def rgb(color):
+    """Convert a color tuple or rgbmatrix Color to a uint8 array."""
+
+    if hasattr(color, "red"):
+        color = (color.red, color.green, color.blue)
+    return np.array(color, dtype=np.uint8)
+
+class Compositor:
+    """Builds LED display frames as NumPy arrays"""
+
+    def __init__(self, width=128, height=32, frame=None):
+        """Class constructor"""
+
+        if frame is None:
+            frame = np.zeros((height, width, 3), dtype=np.uint8)
+
+        self.frame = frame
+        self.height, self.width = frame.shape[:2]
+
+        self._patterns = {}
+        self._circles = {}
+
+    def clear(self):
+        """Clear the frame to black."""
+
+        self.frame[:] = 0
+
+    def fill(self, color):
+        """Fill the whole frame with a single color."""
+
+        self.frame[:] = rgb(color)
+
+    def blit(self, image):
+        """Copy a prepared (height, width, 3) image into the frame."""
+
+        np.copyto(self.frame, image)
+
+    def fill_rect(self, x0, y0, x1, y1, color):
+        """Fill the rectangle with corners (x0, y0) and (x1, y1) inclusive."""
+
+        x0 = max(int(x0), 0)
+        y0 = max(int(y0), 0)
+        x1 = min(int(x1), self.width - 1)
+        y1 = min(int(y1), self.height - 1)
+
+        if x0 <= x1 and y0 <= y1:
+            self.frame[y0:y1+1, x0:x1+1] = rgb(color)
+
+    def rect(self, x0, y0, x1, y1, color):
+        """Draw the outline of a rectangle."""
+
+        self.fill_rect(x0, y0, x1, y0, color)
+        self.fill_rect(x0, y1, x1, y1, color)
+        self.fill_rect(x0, y0, x0, y1, color)
+        self.fill_rect(x1, y0, x1, y1, color)
+
+    def checkered(self, sq_size, invert, color):
+        """Fill the frame with a checkered pattern of sq_size squares."""
+
+        key = (sq_size, invert, tuple(rgb(color)))
+        pattern = self._patterns.get(key)
+
+        if pattern is None:
+            ys = np.arange(self.height)[:, None] // sq_size
+            xs = np.arange(self.width)[None, :] // sq_size
+            lit = (xs + ys) % 2 == (0 if invert else 1)
+            pattern = np.where(lit[:, :, None], rgb(color), np.uint8(0)).astype(np.uint8)
+            self._patterns[key] = pattern
+
+        self.frame[:] = pattern
+
+    def _plot(self, xs, ys, color):
+        """Set all pixels in the coordinate arrays that are inside the frame."""
+
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        self.frame[ys[inside], xs[inside]] = rgb(color)
+
+    def draw_line(self, x0, y0, x1, y1, color):
+        """Draw a line between (x0, y0) and (x1, y1)."""
+
+        x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
+        n = max(abs(x1 - x0), abs(y1 - y0)) + 1
+        xs = np.rint(np.linspace(x0, x1, n)).astype(int)
+        ys = np.rint(np.linspace(y0, y1, n)).astype(int)
+        self._plot(xs, ys, color)
+
+    def draw_circle(self, x0, y0, radius, color):
+        """Draw a circle outline using the midpoint algorithm."""
+
+        offsets = self._circles.get(radius)
+
+        if offsets is None:
+            points = []
+            x = radius
+            y = 0
+            error = 1 - x
+            while y <= x:
+                points.extend([(x, y), (y, x), (-y, x), (-x, y),
+                               (-x, -y), (-y, -x), (y, -x), (x, -y)])
+                y += 1
+                if error < 0:
+                    error += 2 * y + 1
+                else:
+                    x -= 1
+                    error += 2 * (y - x + 1)
+            offsets = np.array(points, dtype=int)
+            self._circles[radius] = offsets
+
+        self._plot(offsets[:, 0] + int(x0), offsets[:, 1] + int(y0), color)
+
+    def draw_text(self, font, x, y, color, text):
+        """Draw text with its baseline at y. Returns the advance width."""
+
+        value = rgb(color)
+        x = int(x)
+        y = int(y)
+        start = x
+
+        for ch in text:
+            glyph = font.glyph(ord(ch))
+            if glyph is None:
+                continue
+
+            mask, x_offset, y_offset, advance = glyph
+            h, w = mask.shape
+
+            if w > 0:
+                gx = x + x_offset
+                gy = y - h - y_offset
+
+                cx0 = max(gx, 0)
+                cy0 = max(gy, 0)
+                cx1 = min(gx + w, self.width)
+                cy1 = min(gy + h, self.height)
+
+                if cx0 < cx1 and cy0 < cy1:
+                    sub = mask[cy0-gy:cy1-gy, cx0-gx:cx1-gx]
+                    self.frame[cy0:cy1, cx0:cx1][sub] = value
+
+            x += advance
+
+        return x - start
+
+    def show(self, canvas, frame=None):
+        """Transfer the frame to the canvas in a single bulk call."""
+
+        if frame is None:
+            frame = self.frame
+
+        canvas.SetImage(Image.fromarray(np.ascontiguousarray(frame)))
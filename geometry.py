@@ -0,0 +1,159 @@
+"""
+Panel geometry
+
+This module derives the positions and font sizes used by the display
+modes from the size of the LED matrix. All fixed placements are
+computed once when the geometry is created, so drawing a frame only
+looks up precomputed coordinates.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from collections import OrderedDict
+
+DIGITS = "0123456789"
+
+class Placement:
+    """Font and text origin chosen for a box"""
+
+    def __init__(self, font, x, y):
+        """Class constructor"""
+
+        self.font = font
+        self.x = x
+        self.y = y
+
+class Geometry:
+    """Precomputed layout of the display modes for a panel size"""
+
+    def __init__(self, width, height, fonts, max_placements=64):
+        """Class constructor. fonts is a list of fonts ordered from the
+        largest to the smallest. At most max_placements placements of
+        free text are cached."""
+
+        self.width = width
+        self.height = height
+        self.fonts = fonts
+
+        self.right = width - 1
+        self.bottom = height - 1
+        self.half = width // 2
+
+        self.max_placements = max_placements
+        self._placements = OrderedDict()
+
+        # Arrow box to the right of the countdowns
+
+        self.arrow_size = min(height, width // 4)
+        self.arrow_x = width - self.arrow_size
+        self.arrow_y = (height - self.arrow_size) // 2
+
+        s = self.arrow_size / 32.0
+
+        self.arrow_cx = self.arrow_x + int(round(19*s))
+        self.arrow_cy = self.arrow_y + int(round(15*s))
+
+        self.arrow_forward = self._arrow_forward_lines(s)
+        self.arrow_right = self._arrow_right_lines(s)
+
+        # Fixed text placements
+
+        self.countdown = self.place("00:00", 0, 0, self.arrow_cx - int(round(9*s)), height, align="left")
+        self.timing = self.place("00:00", 0, 0, width, height, align="left")
+        self.time = self.place("00:00:00", 2, 2, width - 2, height - 2)
+        self.small_font = fonts[-1]
+        self.small_line = self.small_font.ink_extent(DIGITS)[2] + 2
+
+        # Regions of the widget layouts
+
+        self.ticker_height = min(self.small_font.height, height // 2)
+        self.status_height = height - self.ticker_height
+        self.status_countdown_width = width * 7 // 16
+
+    def _arrow_forward_lines(self, s):
+        """Line segments of the arrow pointing forward."""
+
+        x0 = self.arrow_cx
+        al = int(round(8*s))
+        m = int(round(8*s))
+        top = self.arrow_y + m
+        bottom = self.arrow_y + self.arrow_size - m
+
+        lines = []
+        for d in (-1, 0, 1):
+            lines.append((x0 + d, top, x0 + d, bottom))
+            lines.append((x0 + d, top, x0 + d + al, top + al))
+            lines.append((x0 + d, top, x0 + d - al, top + al))
+        return lines
+
+    def _arrow_right_lines(self, s):
+        """Line segments of the arrow pointing right."""
+
+        x0 = self.arrow_x
+        y0 = self.arrow_cy
+        al = int(round(8*s))
+        m = int(round(8*s))
+        tip = x0 + self.arrow_size - m
+
+        lines = []
+        for d in (-1, 0, 1):
+            lines.append((x0 + m, y0 + d, tip, y0 + d))
+            lines.append((tip, y0 + d, tip - al, y0 + d - al))
+            lines.append((tip, y0 + d, tip - al, y0 + d + al))
+        return lines
+
+    def fit_font(self, text, width, height):
+        """Return the largest font showing text within width x height."""
+
+        for font in self.fonts:
+            left, right, ascent, descent = font.ink_extent(text)
+            cap = font.ink_extent(DIGITS)[2]
+            if right - min(left, 0) <= width and max(ascent, cap) <= height:
+                return font
+
+        return self.fonts[-1]
+
+    def place(self, text, x0, y0, x1, y1, align="center", margin=0):
+        """Return the Placement of text inside the box (x0, y0)-(x1, y1),
+        with x1 and y1 exclusive. The most recently used results are
+        cached per text and box."""
+
+        key = (text, x0, y0, x1, y1, align, margin)
+        placement = self._placements.get(key)
+
+        if placement is not None:
+            self._placements.move_to_end(key)
+            return placement
+
+        font = self.fit_font(text, x1 - x0 - 2*margin, y1 - y0)
+        left, right, ascent, descent = font.ink_extent(text)
+        cap = font.ink_extent(DIGITS)[2]
+
+        if align == "left":
+            x = x0 + margin
+        else:
+            x = x0 + (x1 - x0 - (right - left) + 1) // 2 - left
+
+        y = y0 + (y1 - y0 - cap + 1) // 2 + cap
+
+        placement = Placement(font, x, y)
+        self._placements[key] = placement
+
+        if len(self._placements) > self.max_placements:
+            self._placements.popitem(last=False)
+
+        return placement
@@ -0,0 +1,154 @@
+"""
+Render loop health
+
+This module implements the heartbeat of the display render loop and the
+systemd watchdog notifications. The heartbeat records the frame rate and
+the time of the last buffer swap, so a stalled render loop can be
+detected. The startup time of the process is reported with it. Watchdog
+notifications are only sent from the render loop, so systemd restarts
+the service if the loop stops.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import socket
+import time
+
+def process_age():
+    """Seconds since the current process was started, including the
+    interpreter startup, or None if not available."""
+
+    try:
+        with open("/proc/self/stat", "r") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+class Heartbeat:
+    """Frame rate and last swap time of the render loop"""
+
+    def __init__(self, stall_timeout=2.0):
+        """Class constructor"""
+
+        self.stall_timeout = stall_timeout
+        self.started = time.time()
+        self.frames = 0
+        self.fps = 0.0
+        self.last_swap = None
+        self.startup = None
+
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+
+    def beat(self):
+        """Register a swapped frame."""
+
+        self.frames += 1
+        self.last_swap = time.time()
+        self._window_frames += 1
+
+        now = time.monotonic()
+        elapsed = now - self._window_start
+
+        if elapsed >= 1.0:
+            self.fps = self._window_frames / elapsed
+            self._window_start = now
+            self._window_frames = 0
+
+    def status(self):
+        """Return the heartbeat as a dict suitable for JSON.
+
+        The status is answered by the render loop itself, so "ok" can
+        only be false between a stall and the next request being served.
+        A loop that is stuck does not answer at all; callers detect that
+        by the request timing out, as the /health route of the
+        web-server does."""
+
+        now = time.time()
+
+        if self.last_swap is None:
+            age = now - self.started
+        else:
+            age = now - self.last_swap
+
+        return {
+            "ok": age < self.stall_timeout,
+            "fps": round(self.fps, 1),
+            "frames": self.frames,
+            "last_swap": self.last_swap,
+            "age": round(age, 3),
+            "uptime": round(now - self.started, 1),
+            "startup": self.startup,
+        }
+
+class Watchdog:
+    """systemd readiness and watchdog notifications"""
+
+    def __init__(self):
+        """Class constructor"""
+
+        self.socket = None
+        self.interval = None
+        self._last_ping = 0.0
+
+        address = os.environ.get("NOTIFY_SOCKET")
+
+        if address:
+            if address[0] == "@":
+                address = "\0" + address[1:]
+            try:
+                self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self.socket.connect(address)
+            except OSError as e:
+                print("Could not connect to systemd notify socket:", e)
+                self.socket = None
+
+        usec = os.environ.get("WATCHDOG_USEC")
+
+        if usec:
+            self.interval = int(usec) / 1000000.0 / 2.0
+
+    def notify(self, state):
+        """Send a state string to systemd."""
+
+        if self.socket is None:
+            return False
+
+        try:
+            self.socket.send(state.encode("ascii"))
+            return True
+        except OSError:
+            return False
+
+    def ready(self):
+        """Tell systemd that the service has started."""
+
+        return self.notify("READY=1")
+
+    def ping(self):
+        """Send a keep-alive if half the watchdog interval has passed."""
+
+        if self.interval is None:
+            return
+
+        now = time.monotonic()
+
+        if now - self._last_ping >= self.interval:
+            self._last_ping = now
+            self.notify("WATCHDOG=1")
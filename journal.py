@@ -0,0 +1,89 @@
+"""
+Command journal
+
+This module implements an append-only journal of the commands received
+by the display server. Each command is written as one JSON line with its
+arrival time, argument and handling latency. The journal file is rotated
+when it grows beyond a maximum size.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import os
+
+def read_journal(filename):
+    """Return the entries of a journal file as a list of dicts."""
+
+    entries = []
+
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+
+    return entries
+
+class CommandJournal:
+    """Rotating JSONL journal of received commands"""
+
+    def __init__(self, filename, max_bytes=1024*1024, backup_count=5):
+        """Class constructor"""
+
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        self._file = open(filename, "a", encoding="utf-8")
+
+    def append(self, t, command, argument=None, latency=None):
+        """Write a command entry and rotate the journal if needed."""
+
+        entry = {"t": round(t, 6), "command": command}
+
+        if argument is not None:
+            entry["argument"] = argument
+        if latency is not None:
+            entry["latency"] = round(latency, 6)
+
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+        if self.max_bytes > 0 and self._file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        """Move the journal to .1, shifting older backups up by one."""
+
+        self._file.close()
+
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = "%s.%d" % (self.filename, i)
+                if os.path.exists(source):
+                    os.replace(source, "%s.%d" % (self.filename, i + 1))
+            os.replace(self.filename, self.filename + ".1")
+        else:
+            os.remove(self.filename)
+
+        self._file = open(self.filename, "a", encoding="utf-8")
+
+    def close(self):
+        """Close the journal file."""
+
+        self._file.close()
@@ -0,0 +1,229 @@
+"""
+Display layouts
+
+This module implements a layered layout engine for the LED display.
+A layout places independent widgets in regions of the panel. Each
+widget has its own update interval and dirty flag, so only regions
+whose content has changed are recomposited.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from compositor import Compositor
+from math import *
+
+class Widget:
+    """Base class for widgets occupying a region of the display"""
+
+    def __init__(self, x, y, width, height, interval=1.0):
+        """Class constructor"""
+
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.interval = interval
+
+        self.compositor = None
+        self.dirty = True
+        self.next_update = 0.0
+        self.last_state = None
+
+    def state(self, now):
+        """Return a value describing the content shown at time now."""
+
+        return None
+
+    def render(self, compositor, state):
+        """Draw the widget content into the region compositor."""
+
+        pass
+
+    def update(self, clock, now):
+        """Poll the widget and set the dirty flag if its content changed."""
+
+        if clock < self.next_update:
+            return
+
+        self.next_update = clock + self.interval
+
+        state = self.state(now)
+        if state != self.last_state:
+            self.last_state = state
+            self.dirty = True
+
+class CountdownWidget(Widget):
+    """Widget showing minutes and seconds left of a session"""
+
+    def __init__(self, x, y, width, height, font, color, warning_color, time_left, interval=0.25):
+        """Class constructor"""
+
+        super(CountdownWidget, self).__init__(x, y, width, height, interval)
+
+        self.font = font
+        self.color = color
+        self.warning_color = warning_color
+        self.time_left = time_left
+
+    def state(self, now):
+        seconds, length = self.time_left(now)
+        minutes, seconds = divmod(seconds, 60)
+        blink = minutes <= 1 and now.second % 2 == 1
+        return ('{:02d}:{:02d}'.format(minutes, seconds), blink)
+
+    def render(self, compositor, state):
+        time_str, blink = state
+
+        if blink:
+            color = self.warning_color
+        else:
+            color = self.color
+
+        x = max((self.width - self.font.text_width(time_str)) // 2, 0)
+        compositor.draw_text(self.font, x, self.height - 3, color, time_str)
+
+class ClockWidget(Widget):
+    """Widget showing an analog clock"""
+
+    def __init__(self, x, y, width, height, color, hour_color, minute_color, second_color):
+        """Class constructor"""
+
+        super(ClockWidget, self).__init__(x, y, width, height, 1.0)
+
+        self.color = color
+        self.hour_color = hour_color
+        self.minute_color = minute_color
+        self.second_color = second_color
+
+    def state(self, now):
+        return (now.hour, now.minute, now.second)
+
+    def render(self, compositor, state):
+        hour, minute, second = state
+
+        x0 = self.width // 2
+        y0 = self.height // 2
+        r = min(self.width, self.height) // 2 - 1
+
+        compositor.draw_circle(x0, y0, r, self.color)
+
+        hour_angle = (hour+minute/60)*2.0*pi/12.0 - 0.5*pi
+        minute_angle = minute*2.0*pi/60.0 - 0.5*pi
+        second_angle = second*2.0*pi/60.0 - 0.5*pi
+
+        for angle, length, color in ((second_angle, r - 2, self.second_color),
+                                     (minute_angle, r - 2, self.minute_color),
+                                     (hour_angle, r - 5, self.hour_color)):
+            compositor.draw_line(x0, y0, x0 + length*cos(angle), y0 + length*sin(angle), color)
+
+class ProgressBarWidget(Widget):
+    """Widget showing a horizontal progress bar"""
+
+    def __init__(self, x, y, width, height, back_color, bar_color, progress):
+        """Class constructor"""
+
+        super(ProgressBarWidget, self).__init__(x, y, width, height, 1.0)
+
+        self.back_color = back_color
+        self.bar_color = bar_color
+        self.progress = progress
+
+    def state(self, now):
+        return int(round(self.progress(now) * self.width))
+
+    def render(self, compositor, state):
+        compositor.fill(self.back_color)
+        compositor.fill_rect(0, 0, state - 1, self.height - 1, self.bar_color)
+
+class TickerWidget(Widget):
+    """Widget scrolling a text from right to left"""
+
+    def __init__(self, x, y, width, height, font, color, background, text, speed=30):
+        """Class constructor"""
+
+        super(TickerWidget, self).__init__(x, y, width, height, 1.0 / speed)
+
+        self.font = font
+        self.color = color
+        self.background = background
+        self.text = text
+        self.speed = speed
+        self.offset = 0
+        self._text = None
+
+    def state(self, now):
+        text = self.text()
+
+        if text != self._text:
+            self._text = text
+            self.offset = 0
+        else:
+            self.offset = (self.offset + 1) % (self.width + self.font.text_width(text))
+
+        return (text, self.offset)
+
+    def render(self, compositor, state):
+        text, offset = state
+
+        compositor.fill(self.background)
+        compositor.draw_text(self.font, self.width - offset, self.height - 2, self.color, text)
+
+class Layout:
+    """Set of widgets sharing one display frame"""
+
+    def __init__(self, frame):
+        """Class constructor"""
+
+        self.frame = frame
+        self.widgets = []
+
+    def add(self, widget):
+        """Add a widget drawing into its own region of the frame."""
+
+        region = self.frame[widget.y:widget.y+widget.height, widget.x:widget.x+widget.width]
+        widget.compositor = Compositor(frame=region)
+        self.widgets.append(widget)
+        return widget
+
+    @property
+    def interval(self):
+        """Shortest update interval of the widgets in the layout."""
+
+        return min(widget.interval for widget in self.widgets)
+
+    def invalidate(self):
+        """Force all widgets to be redrawn on the next update."""
+
+        for widget in self.widgets:
+            widget.dirty = True
+            widget.next_update = 0.0
+            widget.last_state = None
+
+    def update(self, clock, now):
+        """Recomposite dirty regions. Returns True if anything was redrawn."""
+
+        redrawn = False
+
+        for widget in self.widgets:
+            widget.update(clock, now)
+            if widget.dirty and widget.last_state is not None:
+                widget.compositor.clear()
+                widget.render(widget.compositor, widget.last_state)
+                widget.dirty = False
+                redrawn = True
+
+        return redrawn
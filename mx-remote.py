@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Remote control sender
+
+This tool sends a remote control datagram to the display server, the
+same way a handheld remote does. The datagram is repeated a few times
+to survive packet loss; the display server executes it once. The
+sequence number defaults to the current time in milliseconds, so it
+keeps increasing across runs.
+
+Examples:
+
+    python3 mx-remote.py one_lap --host 192.168.1.10
+    python3 mx-remote.py finish --host 239.255.77.77 --key secret
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from remote import COMMAND_IDS, pack_command
+
+import argparse
+import socket
+import time
+
+# Main function
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Send a remote control command to the MX-sign server.")
+    parser.add_argument("command", choices=sorted(COMMAND_IDS), help="Command to send")
+    parser.add_argument("--host", action="store", help="Display server address, broadcast or multicast group. Default: localhost", default="localhost", type=str)
+    parser.add_argument("--port", action="store", help="Remote control port. Default: 5556", default=5556, type=int)
+    parser.add_argument("--remote-id", action="store", help="Id of this remote. Default: 1", default=1, type=int)
+    parser.add_argument("--sequence", action="store", help="Sequence number. Default: time in milliseconds", default=None, type=int)
+    parser.add_argument("--key", action="store", help="Shared key for signed datagrams. Default: unsigned", default="", type=str)
+    parser.add_argument("--repeat", action="store", help="Number of times the datagram is sent. Default: 3", default=3, type=int)
+    parser.add_argument("--interval", action="store", help="Time between repeats in seconds. Default: 0.02", default=0.02, type=float)
+    args = parser.parse_args()
+
+    sequence = args.sequence
+    if sequence is None:
+        sequence = int(time.time() * 1000)
+
+    data = pack_command(COMMAND_IDS[args.command], args.remote_id, sequence, args.key.encode("utf-8"))
+
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+
+    for i in range(args.repeat):
+        if i > 0:
+            time.sleep(args.interval)
+        s.sendto(data, (args.host, args.port))
+
+    s.close()
+
+    print("Sent %s (id %d, sequence %d) %d times to %s:%d" % (args.command, COMMAND_IDS[args.command], sequence & 0xffffffff, args.repeat, args.host, args.port))
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Command replay and load test tool
+
+This tool fires recorded or synthetic commands at the display server
+socket and reports throughput and latency. Recorded traffic is read from
+a command journal written by mx-screen.py and can be replayed with its
+original timing, scaled in speed, or at a fixed rate. Several clients
+can send in parallel to find the throughput ceiling of the endpoint.
+
+Examples:
+
+    python3 mx-replay.py --journal commands.jsonl --speed 10
+    python3 mx-replay.py --synthetic status --count 1000 --rate 0 --clients 4
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from journal import read_journal
+from protocol import ARGUMENT_COMMANDS
+
+import argparse
+import itertools
+import threading
+import time
+import zmq
+
+class ReplayClient(threading.Thread):
+    """Client thread sending scheduled commands over its own REQ socket"""
+
+    def __init__(self, context, endpoint, timeout, schedule, lock, start_time):
+        """Class constructor"""
+
+        super(ReplayClient, self).__init__(daemon=True)
+
+        self.context = context
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.schedule = schedule
+        self.lock = lock
+        self.start_time = start_time
+
+        self.latencies = []
+        self.timeouts = 0
+        self.socket = None
+
+    def connect(self):
+        """Create a fresh REQ socket with send and receive timeouts."""
+
+        if self.socket is not None:
+            self.socket.close()
+
+        self.socket = self.context.socket(zmq.REQ)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.setsockopt(zmq.RCVTIMEO, self.timeout)
+        self.socket.setsockopt(zmq.SNDTIMEO, self.timeout)
+        self.socket.connect(self.endpoint)
+
+    def request(self, command, argument=None):
+        """Send a command, with its argument in the same message."""
+
+        if argument is None:
+            self.socket.send_string(command)
+        else:
+            self.socket.send_multipart([command.encode("utf-8"), argument.encode("utf-8")])
+
+        return self.socket.recv_string()
+
+    def run(self):
+        self.connect()
+
+        while True:
+            with self.lock:
+                item = next(self.schedule, None)
+
+            if item is None:
+                break
+
+            t, command, argument = item
+
+            delay = self.start_time + t - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            started = time.perf_counter()
+
+            try:
+                if command in ARGUMENT_COMMANDS:
+                    self.request(command, argument or "")
+                else:
+                    self.request(command)
+                self.latencies.append(time.perf_counter() - started)
+            except zmq.Again:
+                self.timeouts += 1
+                self.connect()
+
+        self.socket.close()
+
+def percentile(values, p):
+    """Return the p:th percentile of a sorted list."""
+
+    if not values:
+        return 0.0
+
+    return values[min(int(len(values) * p / 100.0), len(values) - 1)]
+
+def recorded_schedule(filename, speed, rate):
+    """Schedule of journal entries, with original timing divided by speed
+    or at a fixed rate if rate is given."""
+
+    entries = read_journal(filename)
+    if not entries:
+        return []
+
+    t0 = entries[0]["t"]
+    schedule = []
+
+    for i, entry in enumerate(entries):
+        if rate is not None:
+            t = i / rate if rate > 0 else 0.0
+        else:
+            t = (entry["t"] - t0) / speed
+        schedule.append((t, entry["command"], entry.get("argument")))
+
+    return schedule
+
+def synthetic_schedule(commands, count, rate):
+    """Schedule of count commands cycling through a list at a fixed rate."""
+
+    cycle = itertools.cycle(commands)
+    return [(i / rate if rate > 0 else 0.0, next(cycle), None) for i in range(count)]
+
+# Main function
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Replay commands against the MX-sign server.")
+    parser.add_argument("--endpoint", action="store", help="Display server endpoint. Default: tcp://localhost:5555", default="tcp://localhost:5555", type=str)
+    parser.add_argument("--journal", action="store", help="Replay commands from this journal file", default=None, type=str)
+    parser.add_argument("--synthetic", action="store", help="Comma separated commands to send instead of a journal. Default: status", default="status", type=str)
+    parser.add_argument("--count", action="store", help="Number of synthetic commands. Default: 100", default=100, type=int)
+    parser.add_argument("--rate", action="store", help="Commands per second, 0 for as fast as possible. Default: journal timing or 10", default=None, type=float)
+    parser.add_argument("--speed", action="store", help="Speed up factor for journal timing. Default: 1", default=1.0, type=float)
+    parser.add_argument("--clients", action="store", help="Number of parallel clients. Default: 1", default=1, type=int)
+    parser.add_argument("--timeout", action="store", help="Request timeout in milliseconds. Default: 2000", default=2000, type=int)
+    args = parser.parse_args()
+
+    if args.journal is not None:
+        schedule = recorded_schedule(args.journal, args.speed, args.rate)
+    else:
+        rate = 10.0 if args.rate is None else args.rate
+        schedule = synthetic_schedule(args.synthetic.split(","), args.count, rate)
+
+    context = zmq.Context()
+    lock = threading.Lock()
+    items = iter(schedule)
+    start_time = time.perf_counter()
+
+    clients = [ReplayClient(context, args.endpoint, args.timeout, items, lock, start_time) for i in range(args.clients)]
+
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    elapsed = time.perf_counter() - start_time
+
+    latencies = sorted(itertools.chain.from_iterable(client.latencies for client in clients))
+    timeouts = sum(client.timeouts for client in clients)
+
+    print("Commands sent   : %d" % len(schedule))
+    print("Replies         : %d" % len(latencies))
+    print("Timeouts        : %d" % timeouts)
+    print("Elapsed time    : %.2f s" % elapsed)
+    print("Throughput      : %.1f commands/s" % (len(latencies) / elapsed))
+    print("Latency p50     : %.1f ms" % (percentile(latencies, 50) * 1000))
+    print("Latency p90     : %.1f ms" % (percentile(latencies, 90) * 1000))
+    print("Latency p99     : %.1f ms" % (percentile(latencies, 99) * 1000))
+    print("Latency max     : %.1f ms" % (latencies[-1] * 1000 if latencies else 0.0))
+
+    context.term()
@@ -21,123 +21,344 @@ This module implements a flask web-server for controlling the display.
 # limitations under the License.
 #
 
+import asyncio
+import concurrent.futures
+import gzip
+import hashlib
+import json
+import threading
+import time
 import zmq
+import zmq.asyncio
 
-from flask import Flask, abort, redirect, url_for, render_template, request
+from playlist import parse_pages, dumps_pages
+from protocol import ARGUMENT_COMMANDS
+from health import process_age
+
+from flask import Flask, abort, redirect, url_for, render_template, request, jsonify, Response
 app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = 8 * 1024 * 1024
+
+SIGN_ENDPOINT = "tcp://localhost:5555"
+SIGN_TIMEOUT = 1.0
+SIGN_QUEUE_TIMEOUT = 5.0
+SIGN_RETRY_INTERVAL = 5.0
+ASSET_DIR = "assets"
+
+def reply_text(message):
+    """Return the text following "OK," in a reply from the MX-sign server."""
+
+    try:
+        return message.split(",", 1)[1]
+    except (AttributeError, IndexError):
+        return ""
+
+class SignClient:
+    """Client for the MX-sign server.
+
+    All socket I/O runs with zmq.asyncio on an event loop in a background
+    thread, using a single REQ socket. A command and its argument are sent
+    as one two part message. Requests time out after timeout seconds
+    waiting for the reply, and give up after queue_timeout seconds in
+    total, including the time waiting for earlier requests. When the sign
+    does not answer, further requests fail immediately for retry_interval
+    seconds instead of tying up the web worker threads, and the last known
+    status is used. A request given up while queued does not mark the
+    sign as not responding."""
+
+    def __init__(self, endpoint, timeout=SIGN_TIMEOUT, retry_interval=SIGN_RETRY_INTERVAL, queue_timeout=SIGN_QUEUE_TIMEOUT):
+        """Class constructor"""
+
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.queue_timeout = queue_timeout
+
+        self.mode_text = ""
+        self.power_text = ""
+        self.size = None
+        self.unreachable_until = 0.0
+
+        self.context = zmq.asyncio.Context()
+        self.socket = None
+        self.lock = None
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def _connect(self):
+        """Create a new REQ socket, discarding a socket in a broken state."""
+
+        if self.socket is not None:
+            self.socket.close(linger=0)
+
+        print("Connecting to MX-sign server...")
+        self.socket = self.context.socket(zmq.REQ)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.connect(self.endpoint)
+
+    async def _request(self, messages):
+        """Send a command, with its argument as a second part of the same
+        message, and return the reply or None if the sign did not answer
+        within timeout seconds."""
+
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+
+        async with self.lock:
+            if not self.reachable:
+                return None
+
+            if self.socket is None:
+                self._connect()
+
+            try:
+                await self.socket.send_multipart([message.encode("utf-8") for message in messages])
+                reply = await asyncio.wait_for(self.socket.recv_string(), self.timeout)
+                print("Message received: ", reply)
+            except asyncio.TimeoutError:
+                self._connect()
+                self.unreachable_until = time.monotonic() + self.retry_interval
+                return None
+            except asyncio.CancelledError:
+                self._connect()
+                raise
+
+            self.unreachable_until = 0.0
+
+            return reply
+
+    @property
+    def reachable(self):
+        """False while waiting to retry an unresponsive sign."""
+
+        return time.monotonic() >= self.unreachable_until
+
+    def request(self, *messages):
+        """Send a command, optionally followed by its argument. Returns the
+        reply or None if the sign is not responding."""
+
+        if not self.reachable:
+            return None
+
+        future = asyncio.run_coroutine_threadsafe(self._request(messages), self.loop)
+
+        try:
+            reply = future.result(self.queue_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            print("Request given up while waiting: ", messages[0])
+            return None
+        except zmq.ZMQError:
+            self.unreachable_until = time.monotonic() + self.retry_interval
+            return None
+
+        if reply is None:
+            return None
+
+        if reply.startswith("OK,") and messages[0] not in ("power", "health", "panel_size"):
+            self.mode_text = reply_text(reply)
+
+        return reply
+
+    def status(self):
+        """Return (mode_text, power_text, online), using the last known
+        status if the sign is not responding."""
+
+        reply = self.request("status")
+
+        if reply is None:
+            return self.mode_text, self.power_text, False
+
+        reply = self.request("power")
+
+        if reply is not None:
+            self.power_text = reply_text(reply)
+
+        return self.mode_text, self.power_text, True
+
+    def panel_size(self):
+        """Return (width, height) of the LED panel or None if unknown."""
+
+        if self.size is None:
+            reply = self.request("panel_size")
+            try:
+                width, height = reply_text(reply).split("x")
+                self.size = int(width), int(height)
+            except ValueError:
+                return None
+
+        return self.size
+
+sign = SignClient(SIGN_ENDPOINT)
+
+class PrecompiledPage:
+    """Page rendered once at startup with a precomputed ETag and gzip body"""
+
+    def __init__(self, body, mimetype="text/html; charset=utf-8", max_age=3600):
+        """Class constructor"""
+
+        self.body = body
+        self.gzipped = gzip.compress(body, 9)
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.mimetype = mimetype
+        self.max_age = max_age
+
+    def response(self):
+        """Return a cacheable response for the current request."""
+
+        if request.if_none_match.contains(self.etag):
+            response = Response(status=304)
+        elif "gzip" in request.accept_encodings:
+            response = Response(self.gzipped, mimetype=self.mimetype)
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = Response(self.body, mimetype=self.mimetype)
+
+        response.set_etag(self.etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        response.vary.add("Accept-Encoding")
+
+        return response
+
+with app.test_request_context():
+    start_page_shell = PrecompiledPage(render_template('index.html').encode("utf-8"))
+
+startup_time = process_age()
+
+if startup_time is not None:
+    print("Startup: web-server ready after %.3f s" % startup_time)
+
+def status_response(mode_text, power_text, online):
+    """Return the status as a small uncached JSON response."""
+
+    response = jsonify(mode_text=mode_text, power_text=power_text, online=online)
+    response.cache_control.no_store = True
+    return response
 
 @app.route('/')
 def start_page():
-    """Render server start page."""
+    """Serve the precompiled start page. The status is loaded from /status."""
 
-    context = zmq.Context()
-    socket = context.socket(zmq.REQ)
-    
-    print("Connecting to MX-sign server...")
-    socket.connect("tcp://localhost:5555")
+    return start_page_shell.response()
 
-    socket.send_string("status")
-    message = socket.recv_string()
-    print("Message received: ", message)
+@app.route('/status')
+def status():
+    """Return the current or last known status of the sign."""
 
-    mode_text = ""
+    return status_response(*sign.status())
 
-    try:
-        mode_text = message.split(",")[1]
-    except:
-        pass
+@app.route('/health')
+def health():
+    """Report the health of the display render loop."""
 
-    socket.close()
+    message = sign.request("health")
 
-    return render_template('index.html', mode_text=mode_text)
+    try:
+        status = json.loads(reply_text(message))
+    except ValueError:
+        status = {"ok": False, "error": "MX-sign server not responding"}
+
+    if status["ok"]:
+        return jsonify(status)
+    else:
+        return jsonify(status), 503
 
 @app.route('/set_info_text', methods=['GET', 'POST'])
 def set_info_text():
     """Handle the set_info_text request."""
 
     if request.method == 'POST': 
-        info_text = request.form.get('info_text')
+        sign.request('set_info_text', request.form.get('info_text', ''))
 
-        context = zmq.Context()
-        socket = context.socket(zmq.REQ)
-        
-        print("Connecting to MX-sign server...")
-        socket.connect("tcp://localhost:5555")
+    return redirect(url_for('start_page'), 303)
+
+@app.route('/set_warn_text', methods=['GET', 'POST'])
+def set_warn_text():
+    """Handle the set_warn_text request"""
+
+    if request.method == 'POST': 
+        sign.request('set_warn_text', request.form.get('warn_text', ''))
+
+    return redirect(url_for('start_page'), 303)
+
+@app.route('/set_brightness', methods=['GET', 'POST'])
+def set_brightness():
+    """Handle the set_brightness request"""
+
+    if request.method == 'POST': 
+        sign.request('set_brightness', request.form.get('brightness', ''))
+
+    return redirect(url_for('start_page'), 303)
 
-        socket.send_string('set_info_text')
-        message = socket.recv_string()
-        print("Message received: ", message)
-        socket.send_string(info_text)
-        message = socket.recv_string()
-        print("Message received: ", message)
+@app.route('/set_playlist', methods=['GET', 'POST'])
+def set_playlist():
+    """Send a playlist, one page per line, to the socket server."""
 
-        mode_text = ""
+    if request.method == 'POST':
         try:
-            mode_text = message.split(",")[1]
-        except:
-            pass
+            pages = parse_pages(request.form.get('playlist', ''))
+        except ValueError:
+            abort(400)
 
-        socket.close()
+        sign.request('set_playlist', dumps_pages(pages))
 
-        return render_template('index.html', mode_text=mode_text)
-    else:
-        return render_template('index.html')
-        
+    return redirect(url_for('start_page'), 303)
 
-@app.route('/set_warn_text', methods=['GET', 'POST'])
-def set_warn_text():
-    """Handle the set_warn_text request"""
+@app.route('/upload_image', methods=['GET', 'POST'])
+def upload_image():
+    """Convert an uploaded image to the panel size and show it."""
 
-    if request.method == 'POST': 
-        warn_text = request.form.get('warn_text')
+    if request.method == 'POST':
 
-        context = zmq.Context()
-        socket = context.socket(zmq.REQ)
-        
-        print("Connecting to MX-sign server...")
-        socket.connect("tcp://localhost:5555")
+        # Pillow and NumPy are only loaded when the first image is uploaded
+
+        from assets import AssetStore, image_name, prepare_image
+
+        upload = request.files.get('image')
 
-        socket.send_string('set_warn_text')
-        message = socket.recv_string()
-        print("Message received: ", message)
-        socket.send_string(warn_text)
-        message = socket.recv_string()
-        print("Message received: ", message)
+        if upload is None or not upload.filename:
+            abort(400)
 
-        mode_text = ""
+        name = request.form.get('name', '') or image_name(upload.filename)
+        size = sign.panel_size()
+
+        if size is None:
+            abort(503)
+
+        store = AssetStore(ASSET_DIR, *size)
 
         try:
-            mode_text = message.split(",")[1]
-        except:
-            pass
+            store.save(name, prepare_image(upload.stream, *size))
+        except (OSError, ValueError):
+            abort(400)
 
-        socket.close()
+        sign.request('show_image', name)
 
-        return render_template('index.html', mode_text=mode_text)
-    else:
-        return render_template('index.html')
+    return redirect(url_for('start_page'), 303)
 
-@app.route("/command/<cmd>")
-def command(cmd):
-    """Redirect other request to socket server."""
+@app.route('/show_image', methods=['GET', 'POST'])
+def show_image():
+    """Show a previously uploaded image."""
 
-    context = zmq.Context()
-    socket = context.socket(zmq.REQ)
-    
-    print("Connecting to MX-sign server...")
-    socket.connect("tcp://localhost:5555")
+    if request.method == 'POST': 
+        sign.request('show_image', request.form.get('name', ''))
 
-    socket.send_string(cmd)
-    message = socket.recv_string()
-    print("Message received: ", message)
+    return redirect(url_for('start_page'), 303)
 
-    mode_text = ""
+@app.route("/command/<cmd>")
+def command(cmd):
+    """Redirect other request to socket server. Commands taking an
+    argument have their own routes."""
 
-    try:
-        mode_text = message.split(",")[1]
-    except:
-        pass
+    if cmd in ARGUMENT_COMMANDS:
+        abort(400)
 
-    socket.close()
+    reply = sign.request(cmd)
 
-    return redirect(url_for('start_page', mode_text=mode_text))
\ No newline at end of file
+    if request.accept_mimetypes.best == "application/json":
+        return status_response(sign.mode_text, sign.power_text, reply is not None)
+    else:
+        return redirect(url_for('start_page'))
@@ -0,0 +1,103 @@
+"""
+Network address
+
+This module resolves the IP address shown on the startup screen. The
+address is resolved again in a background thread only when the network
+interfaces change, using a netlink socket on Linux and polling
+elsewhere, so the render loop never waits for a lookup.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import socket
+import threading
+import time
+
+# Netlink multicast groups for link, IPv4 address and IPv4 route changes
+
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+
+def get_ip():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        # doesn't even have to be reachable
+        s.connect(('10.255.255.255', 1))
+        IP = s.getsockname()[0]
+    except:
+        IP = '127.0.0.1'
+    finally:
+        s.close()
+    return IP
+
+class IpMonitor(threading.Thread):
+    """Background thread calling callback(ip) when the IP address changes"""
+
+    def __init__(self, callback, resolve=get_ip, poll_interval=30.0, settle_time=1.0):
+        """Class constructor"""
+
+        super(IpMonitor, self).__init__(daemon=True)
+
+        self.callback = callback
+        self.resolve = resolve
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.ip = None
+
+    def _netlink_socket(self):
+        """Socket receiving interface changes or None if not supported."""
+
+        try:
+            s = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            s.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+            return s
+        except (AttributeError, OSError):
+            return None
+
+    def _wait(self, s):
+        """Wait for a change, then for the burst of related changes to end."""
+
+        if s is None:
+            time.sleep(self.poll_interval)
+            return
+
+        s.settimeout(None)
+        s.recv(65536)
+        s.settimeout(self.settle_time)
+
+        try:
+            while True:
+                s.recv(65536)
+        except socket.timeout:
+            pass
+
+    def check(self):
+        """Resolve the address and report it if it has changed."""
+
+        ip = self.resolve()
+
+        if ip != self.ip:
+            self.ip = ip
+            self.callback(ip)
+
+    def run(self):
+        s = self._netlink_socket()
+
+        while True:
+            self.check()
+            self._wait(s)
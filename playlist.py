@@ -0,0 +1,146 @@
+"""
+Message playlist
+
+This module implements a playlist of pages rotated by the display-server
+itself. Each page is shown in one of the static display modes for a
+number of seconds. The rendered frame of each page is cached, so
+showing a page is a single copy per frame until its content changes.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+
+# Display modes that can be used on a page. The text is the info or
+# warning text or the name of an image.
+
+PAGE_MODES = ("info", "warn", "image", "one_lap", "two_lap", "qualify")
+
+class Page:
+    """Page of a playlist"""
+
+    def __init__(self, mode, duration, text=""):
+        """Class constructor. Raises ValueError for an invalid page."""
+
+        if mode not in PAGE_MODES:
+            raise ValueError("Invalid page mode: %r" % mode)
+
+        duration = float(duration)
+
+        if not duration > 0:
+            raise ValueError("Invalid page duration: %r" % duration)
+
+        if text is None:
+            text = ""
+
+        if not isinstance(text, str):
+            raise ValueError("Invalid page text: %r" % (text,))
+
+        self.mode = mode
+        self.duration = duration
+        self.text = text
+
+    @property
+    def key(self):
+        """Content of the page, used as key of the frame cache."""
+
+        return (self.mode, self.text)
+
+def parse_pages(text):
+    """Parse one page per line written as mode,seconds,text."""
+
+    pages = []
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            fields = line.split(",", 2)
+            if len(fields) < 2:
+                raise ValueError("Invalid page: %r" % line)
+            pages.append(Page(fields[0].strip(), fields[1], fields[2].strip() if len(fields) > 2 else ""))
+
+    return pages
+
+def dumps_pages(pages):
+    """Pages as a JSON string for the set_playlist command."""
+
+    return json.dumps([{"mode": p.mode, "duration": p.duration, "text": p.text} for p in pages], ensure_ascii=False)
+
+def loads_pages(data):
+    """Pages from a JSON string. Raises ValueError if invalid."""
+
+    try:
+        return [Page(p["mode"], p["duration"], p.get("text", "")) for p in json.loads(data)]
+    except (TypeError, KeyError, AttributeError) as e:
+        raise ValueError("Invalid playlist: %s" % e)
+
+class Playlist:
+    """Ordered pages shown in turn, with cached page frames"""
+
+    def __init__(self):
+        """Class constructor"""
+
+        self.pages = []
+        self.index = 0
+        self.started = None
+        self.frames = {}
+
+    def set_pages(self, pages):
+        """Replace the pages and restart from the first page."""
+
+        self.pages = list(pages)
+        self.index = 0
+        self.started = None
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop all cached page frames."""
+
+        self.frames.clear()
+
+    def page(self, now):
+        """Return the page to show at monotonic time now, or None if the
+        playlist is empty."""
+
+        if not self.pages:
+            return None
+
+        if self.started is None:
+            self.started = now
+
+        total = sum(p.duration for p in self.pages)
+
+        if now - self.started >= total:
+            self.started = now - (now - self.started) % total
+
+        while now - self.started >= self.pages[self.index].duration:
+            self.started += self.pages[self.index].duration
+            self.index = (self.index + 1) % len(self.pages)
+
+        return self.pages[self.index]
+
+    def frame(self, page, render):
+        """Return the cached frame of a page, calling render(page) to
+        create it the first time. render must return a new array."""
+
+        frame = self.frames.get(page.key)
+
+        if frame is None:
+            frame = render(page)
+            self.frames[page.key] = frame
+
+        return frame
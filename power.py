@@ -0,0 +1,122 @@
+"""
+Brightness and power management
+
+This module implements the brightness policy of the LED display. The
+brightness is taken from a manual setting or a time of day schedule,
+lowered for mostly white screens and finally capped so that the power
+estimated from the lit pixels of each frame stays within a budget.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import numpy as np
+
+def parse_schedule(text):
+    """Parse a schedule string like "07:00=100,20:00=40" into a sorted list
+    of (minute of day, brightness) tuples. Raises ValueError if malformed."""
+
+    schedule = []
+
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        clock, brightness = item.split("=")
+        hour, minute = clock.split(":")
+        if not (0 <= int(hour) < 24 and 0 <= int(minute) < 60):
+            raise ValueError("Invalid time in schedule: %r" % clock)
+        schedule.append((int(hour)*60 + int(minute), clamp_brightness(int(brightness))))
+
+    return sorted(schedule)
+
+def clamp_brightness(value):
+    """Limit a brightness value to the 1..100 range of the matrix."""
+
+    return max(1, min(100, int(value)))
+
+class PowerManager:
+    """Brightness policy and power budget of the LED display"""
+
+    def __init__(self, brightness=100, schedule=None, white_brightness=60, white_level=0.4, budget=None, channel_current=0.0013):
+        """Class constructor"""
+
+        self.default_brightness = clamp_brightness(brightness)
+        self.manual_brightness = None
+        self.schedule = schedule or []
+        self.white_brightness = white_brightness
+        self.white_level = white_level
+        self.budget = budget
+        self.channel_current = channel_current
+
+        self.brightness = self.default_brightness
+        self.current = 0.0
+
+    def set_brightness(self, value):
+        """Set a fixed brightness, overriding the schedule."""
+
+        self.manual_brightness = clamp_brightness(value)
+
+    def set_auto(self):
+        """Return to scheduled brightness."""
+
+        self.manual_brightness = None
+
+    @property
+    def auto(self):
+        return self.manual_brightness is None
+
+    def scheduled_brightness(self, now):
+        """Brightness from the time of day schedule."""
+
+        if not self.schedule:
+            return self.default_brightness
+
+        minute = now.hour*60 + now.minute
+        brightness = self.schedule[-1][1]
+
+        for start, value in self.schedule:
+            if start <= minute:
+                brightness = value
+
+        return brightness
+
+    def estimate(self, frame, brightness):
+        """Estimated panel current in amperes for a frame at a brightness."""
+
+        return frame.sum(dtype=np.uint64) / 255.0 * self.channel_current * brightness / 100.0
+
+    def update(self, now, frame):
+        """Compute the brightness to use for a frame."""
+
+        if self.manual_brightness is not None:
+            brightness = self.manual_brightness
+        else:
+            brightness = self.scheduled_brightness(now)
+
+            if frame.min(axis=2).mean() / 255.0 > self.white_level:
+                brightness = min(brightness, self.white_brightness)
+
+        current = self.estimate(frame, brightness)
+
+        if self.budget is not None and current > self.budget:
+            brightness = clamp_brightness(brightness * self.budget / current)
+            current = self.estimate(frame, brightness)
+
+        self.brightness = brightness
+        self.current = current
+
+        return brightness
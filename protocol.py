@@ -0,0 +1,28 @@
+"""
+Command protocol
+
+This module holds the definitions of the command protocol shared by the
+display-server and its clients. Commands are sent as strings over a
+ZeroMQ REQ/REP socket. A command taking an argument is sent as a two
+part message with the command and the argument.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Commands taking an argument
+
+ARGUMENT_COMMANDS = frozenset({"set_info_text", "set_warn_text", "set_brightness", "show_image", "set_playlist"})
@@ -0,0 +1,10 @@
+#!/bin/sh
+#
+# Render the reference command log on a virtual clock and compare the
+# frames with the golden digests. Pass --update-golden to rewrite the
+# golden file after an intended change of the rendering.
+#
+
+cd "$(dirname "$0")/.."
+
+python3 simulation.py --start "2020-01-01 16:58:30" --duration 230 --commands reference/commands.jsonl --golden reference/golden.json "$@"
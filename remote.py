@@ -0,0 +1,232 @@
+"""
+Datagram remote control
+
+This module implements a compact binary protocol for handheld remotes.
+Each command is a single UDP datagram, sent directly or to a multicast
+group, containing a command id, the id of the remote and a sequence
+number, optionally followed by a truncated HMAC-SHA256. Remotes can
+send every datagram several times; repeats are dropped using the
+sequence number, so a command is executed once.
+
+Datagram layout (network byte order):
+
+    2 bytes  magic "MX"
+    1 byte   protocol version (1)
+    1 byte   command id, see REMOTE_COMMANDS
+    2 bytes  remote id
+    4 bytes  sequence number, increasing for every new command
+    8 bytes  HMAC-SHA256 of the first 10 bytes, only with a shared key
+
+Sequence numbers are compared per remote id with wrap-around, so a
+remote should derive them from a clock or keep them across restarts.
+The last sequence number of each remote is saved with the time it was
+received to a state file, so datagrams captured earlier are not
+accepted again after the display server has been restarted. A remote
+not heard from for SEQUENCE_WINDOW seconds (24 hours) is forgotten and
+its next sequence number is accepted whatever its value. Remotes whose
+counter was reset or which were idle for a long time are accepted again
+after that, at the cost of accepting older datagrams from them too.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import hashlib
+import hmac
+import json
+import os
+import socket
+import struct
+import time
+
+MAGIC = b"MX"
+VERSION = 1
+
+HEADER = struct.Struct("!2sBBHI")
+MAC_SIZE = 8
+
+# Seconds after which the last sequence number of a remote is forgotten
+
+SEQUENCE_WINDOW = 24 * 3600
+
+# Commands available to remotes. Ids must never be reused.
+
+REMOTE_COMMANDS = {
+    1: "one_lap",
+    2: "two_lap",
+    3: "finish",
+    4: "warn",
+    5: "info",
+    6: "qualify",
+    7: "time",
+    8: "timing",
+    9: "reset_timing",
+    10: "off",
+    11: "playlist",
+    12: "image",
+    13: "startup",
+    14: "time_left",
+    15: "countdown_clock",
+    16: "countdown_warn",
+}
+
+COMMAND_IDS = {command: command_id for command_id, command in REMOTE_COMMANDS.items()}
+
+def mac(key, header):
+    """Truncated HMAC of a datagram header."""
+
+    return hmac.new(key, header, hashlib.sha256).digest()[:MAC_SIZE]
+
+def pack_command(command_id, remote_id, sequence, key=None):
+    """Return the datagram for a command."""
+
+    header = HEADER.pack(MAGIC, VERSION, command_id, remote_id, sequence & 0xffffffff)
+
+    if key:
+        return header + mac(key, header)
+    else:
+        return header
+
+def unpack_command(data, key=None):
+    """Return (command id, remote id, sequence) of a datagram or None if
+    it is malformed or not signed with the key."""
+
+    if key:
+        if len(data) != HEADER.size + MAC_SIZE:
+            return None
+        header = data[:HEADER.size]
+        if not hmac.compare_digest(mac(key, header), data[HEADER.size:]):
+            return None
+    else:
+        if len(data) not in (HEADER.size, HEADER.size + MAC_SIZE):
+            return None
+        header = data[:HEADER.size]
+
+    magic, version, command_id, remote_id, sequence = HEADER.unpack(header)
+
+    if magic != MAGIC or version != VERSION:
+        return None
+
+    return command_id, remote_id, sequence
+
+class RemoteListener:
+    """Non-blocking UDP listener for remote control datagrams"""
+
+    def __init__(self, port, group=None, key=None, host="", state_file=None, window=SEQUENCE_WINDOW):
+        """Class constructor. With a multicast group the listener joins
+        the group on all interfaces. The last sequence numbers are kept
+        in state_file if given."""
+
+        self.key = key
+        self.state_file = state_file
+        self.window = window
+        self.last_sequence = self.load_state()
+        self.received = 0
+        self.rejected = 0
+        self.repeated = 0
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+
+        if group:
+            membership = struct.pack("4s4s", socket.inet_aton(group), socket.inet_aton("0.0.0.0"))
+            self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+
+        self.socket.setblocking(False)
+
+    def load_state(self):
+        """Read the last sequence numbers and their receive times from
+        the state file."""
+
+        if not self.state_file:
+            return {}
+
+        try:
+            with open(self.state_file, "r") as f:
+                return {int(remote_id): (int(sequence), float(seen)) for remote_id, (sequence, seen) in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print("Could not read remote state:", e)
+            return {}
+
+    def save_state(self):
+        """Write the last sequence numbers to the state file."""
+
+        if not self.state_file:
+            return
+
+        temp = self.state_file + ".tmp"
+
+        try:
+            with open(temp, "w") as f:
+                json.dump(self.last_sequence, f)
+            os.replace(temp, self.state_file)
+        except OSError as e:
+            print("Could not write remote state:", e)
+
+    def is_new(self, remote_id, sequence, now=None):
+        """True if sequence is newer than the last one seen from the
+        remote, or if the remote has not been heard from within the
+        window."""
+
+        if now is None:
+            now = time.time()
+
+        last = self.last_sequence.get(remote_id)
+
+        if last is not None:
+            last_sequence, seen = last
+            if now - seen < self.window and not 0 < (sequence - last_sequence) % 2**32 < 2**31:
+                return False
+
+        self.last_sequence[remote_id] = (sequence, now)
+        self.save_state()
+        return True
+
+    def poll(self):
+        """Return the commands received since the last call."""
+
+        commands = []
+
+        while True:
+            try:
+                data, address = self.socket.recvfrom(64)
+            except (BlockingIOError, InterruptedError):
+                break
+
+            packet = unpack_command(data, self.key)
+
+            if packet is None or packet[0] not in REMOTE_COMMANDS:
+                self.rejected += 1
+                continue
+
+            command_id, remote_id, sequence = packet
+
+            if not self.is_new(remote_id, sequence):
+                self.repeated += 1
+                continue
+
+            self.received += 1
+            commands.append(REMOTE_COMMANDS[command_id])
+
+        return commands
+
+    def close(self):
+        """Close the socket."""
+
+        self.socket.close()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Display simulation
+
+This module runs the StatusDisplay render loop against an accelerated
+virtual clock and a recorded command log without any LED hardware.
+Frames are captured to an in-memory stream and summarised by a digest
+that can be compared with golden values, so changes to the rendering
+code can be checked to be pixel identical and timed at scale.
+
+Example:
+
+    python3 simulation.py --start "2020-01-01 08:00" --duration 36000 \\
+        --commands commands.jsonl --fps 1 --golden golden.json
+
+Each line of the command log is a JSON object with the time "t" in
+seconds, the "command" and an optional "argument". Times are relative to
+the first entry, so a command journal written by the display server can
+be replayed directly.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from statusdisplay import StatusDisplay
+from datetime import datetime, timedelta
+
+import argparse
+import hashlib
+import io
+import json
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+class VirtualClock:
+    """Clock advanced explicitly by the simulation"""
+
+    def __init__(self, start):
+        """Class constructor"""
+
+        self.start = start
+        self.elapsed = 0.0
+
+    def now(self):
+        """Current virtual date and time."""
+
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def monotonic(self):
+        """Virtual seconds since the start of the simulation."""
+
+        return self.elapsed
+
+    def advance(self, dt):
+        """Move the clock dt seconds forward."""
+
+        self.elapsed += dt
+
+class VirtualCanvas:
+    """Canvas keeping the last frame in memory instead of driving a matrix"""
+
+    def __init__(self, width=128, height=32):
+        """Class constructor"""
+
+        self.width = width
+        self.height = height
+        self.brightness = 100
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def SetImage(self, image):
+        self.frame = np.asarray(image)
+
+class FrameRecorder:
+    """Captures frames to an in-memory stream"""
+
+    def __init__(self, shape, checkpoint_interval=1000):
+        """Class constructor"""
+
+        self.shape = shape
+        self.checkpoint_interval = checkpoint_interval
+        self.stream = io.BytesIO()
+        self.index = []
+        self.checkpoints = []
+        self.frames = 0
+
+        self._digest = hashlib.sha256()
+        self._last = None
+
+    def record(self, t, frame, brightness):
+        """Add a frame. Only frames differing from the previous one are
+        compressed into the stream, repeats are counted."""
+
+        data = bytes([brightness]) + frame.tobytes()
+
+        if data != self._last:
+            self._last = data
+            self._digest.update(struct.pack("<I", self.frames))
+            self._digest.update(data)
+
+            compressed = zlib.compress(data, 1)
+            self.index.append((self.frames, t, self.stream.tell(), len(compressed)))
+            self.stream.write(compressed)
+
+        self.frames += 1
+
+        if self.frames % self.checkpoint_interval == 0:
+            self.checkpoints.append(self.digest)
+
+    @property
+    def digest(self):
+        """Digest of all frames recorded so far."""
+
+        return self._digest.hexdigest()
+
+    def frame(self, i):
+        """Return (time, brightness, frame) of the i:th unique frame."""
+
+        number, t, offset, length = self.index[i]
+        data = zlib.decompress(self.stream.getbuffer()[offset:offset+length])
+        return t, data[0], np.frombuffer(data[1:], dtype=np.uint8).reshape(self.shape)
+
+def load_commands(filename):
+    """Read a command log. Returns a list of (seconds, command, argument)."""
+
+    commands = []
+
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                commands.append((float(entry["t"]), entry["command"], entry.get("argument")))
+
+    if commands:
+        t0 = commands[0][0]
+        commands = sorted((t - t0, command, argument) for t, command, argument in commands)
+
+    return commands
+
+class Simulator:
+    """Runs a StatusDisplay against a virtual clock"""
+
+    def __init__(self, start, width=128, height=32, fps=None):
+        """Class constructor. With fps None the frame rate follows the
+        frame interval chosen by the display, as in the real render loop."""
+
+        self.clock = VirtualClock(start)
+        self.canvas = VirtualCanvas(width, height)
+        self.fps = fps
+
+        self.status_display = StatusDisplay(self.canvas, self.clock)
+        self.status_display.resolve_ip = lambda: "192.0.2.1"
+        self.status_display.ip = self.status_display.resolve_ip()
+
+        self.recorder = FrameRecorder((height, width, 3))
+
+    def run(self, commands, duration):
+        """Run the render loop for duration virtual seconds."""
+
+        status_display = self.status_display
+        pending = list(commands)
+        pending.reverse()
+
+        while self.clock.elapsed < duration:
+
+            while pending and pending[-1][0] <= self.clock.elapsed:
+                t, command, argument = pending.pop()
+                status_display.execute(command, argument)
+
+            status_display.draw()
+            self.recorder.record(self.clock.elapsed, self.canvas.frame, int(self.canvas.brightness))
+
+            if self.fps is None:
+                frame_interval = status_display.frame_interval()
+            else:
+                frame_interval = 1.0 / self.fps
+
+            self.clock.advance(frame_interval)
+            status_display.update(frame_interval)
+
+# Main function
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Run the display render loop against a virtual clock.")
+    parser.add_argument("--start", action="store", help="Virtual start time. Default: 2020-01-01 08:00", default="2020-01-01 08:00", type=str)
+    parser.add_argument("--duration", action="store", help="Simulated time in seconds. Default: 3600", default=3600.0, type=float)
+    parser.add_argument("--commands", action="store", help="Command log in JSONL format", default=None, type=str)
+    parser.add_argument("--width", action="store", help="Panel width in pixels. Default: 128", default=128, type=int)
+    parser.add_argument("--height", action="store", help="Panel height in pixels. Default: 32", default=32, type=int)
+    parser.add_argument("--fps", action="store", help="Fixed frame rate. Default: follow the render loop", default=None, type=float)
+    parser.add_argument("--golden", action="store", help="Compare the frame digests with this golden file", default=None, type=str)
+    parser.add_argument("--update-golden", action="store_true", help="Write the frame digests to the golden file instead of comparing")
+    parser.add_argument("--output", action="store", help="Write the captured frame stream to this file", default=None, type=str)
+    args = parser.parse_args()
+
+    commands = []
+    if args.commands is not None:
+        commands = load_commands(args.commands)
+
+    simulator = Simulator(datetime.fromisoformat(args.start), args.width, args.height, args.fps)
+
+    t0 = time.perf_counter()
+    simulator.run(commands, args.duration)
+    elapsed = time.perf_counter() - t0
+
+    recorder = simulator.recorder
+
+    print("Frames rendered : %d" % recorder.frames)
+    print("Unique frames   : %d" % len(recorder.index))
+    print("Wall time       : %.2f s (%.0f frames/s, %.0fx real time)" % (elapsed, recorder.frames / elapsed, args.duration / elapsed))
+    print("Digest          : %s" % recorder.digest)
+
+    if args.output is not None:
+        with open(args.output, "wb") as f:
+            f.write(recorder.stream.getbuffer())
+
+    if args.golden is not None:
+        result = {
+            "width": args.width,
+            "height": args.height,
+            "frames": recorder.frames,
+            "digest": recorder.digest,
+            "checkpoints": recorder.checkpoints,
+        }
+
+        if args.update_golden:
+            with open(args.golden, "w") as f:
+                json.dump(result, f, indent=4)
+            print("Golden digests written to", args.golden)
+        else:
+            with open(args.golden, "r") as f:
+                golden = json.load(f)
+
+            if golden == result:
+                print("Frames match golden digests")
+            else:
+                for i, (expected, actual) in enumerate(zip(golden["checkpoints"], recorder.checkpoints)):
+                    if expected != actual:
+                        print("First difference before frame %d" % ((i + 1) * recorder.checkpoint_interval))
+                        break
+                print("Frames DO NOT match golden digests")
+                sys.exit(1)
@@ -0,0 +1,790 @@
+"""
+Status display
+
+This module implements the drawing and command logic of the LED display.
+It has no dependency on the matrix hardware, so it can be driven both by
+the display server and by the simulation harness.
+"""
+
+#
+# Copyright 2019-2021 Jonas Lindemann
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from compositor import Compositor, BdfFont
+from animation import Animator
+from layout import Layout, CountdownWidget, ClockWidget, ProgressBarWidget, TickerWidget
+from power import PowerManager
+from geometry import Geometry, DIGITS
+from health import Heartbeat
+from assets import AssetStore
+from playlist import Playlist, loads_pages
+from network import get_ip
+from protocol import ARGUMENT_COMMANDS
+from datetime import datetime
+
+import json
+import time
+
+class SystemClock:
+    """Clock returning the real time"""
+
+    def now(self):
+        """Current date and time."""
+
+        return datetime.now()
+
+    def monotonic(self):
+        """Monotonic time in seconds used for frame timing."""
+
+        return time.monotonic()
+
+class StatusDisplay:
+    """Main class implementing the control of the LED display"""
+
+    DM_OFF = 0
+    DM_TIME_LEFT = 1
+    DM_INFO_TEXT = 2
+    DM_WARNING_TEXT = 3
+    DM_TIME = 4
+    DM_CLOSED = 5
+    DM_STARTUP = 6
+    DM_ONE_LAP = 7
+    DM_TWO_LAP = 8
+    DM_FINISH = 9
+    DM_TIME_QUALIFY = 10
+    DM_TIME_LEFT_20_FULL = 11
+    DM_TIME_LEFT_20_HALF = 15
+    DM_TIME_LEFT_25_35_FULL = 13
+    DM_TIME_LEFT_25_35_HALF = 14
+    DM_TIMING = 12
+    DM_COUNTDOWN_CLOCK = 16
+    DM_COUNTDOWN_WARN = 17
+    DM_IMAGE = 18
+    DM_PLAYLIST = 19
+
+    # Commands switching directly to a display mode
+
+    COMMAND_MODES = {
+        "time_left": DM_TIME_LEFT,
+        "time_left_twenty": DM_TIME_LEFT_20_FULL,
+        "time_left_twenty_half": DM_TIME_LEFT_20_HALF,
+        "time_left_25_35_full": DM_TIME_LEFT_25_35_FULL,
+        "time_left_25_35_half": DM_TIME_LEFT_25_35_HALF,
+        "time": DM_TIME,
+        "off": DM_OFF,
+        "info": DM_INFO_TEXT,
+        "warn": DM_WARNING_TEXT,
+        "one_lap": DM_ONE_LAP,
+        "two_lap": DM_TWO_LAP,
+        "finish": DM_FINISH,
+        "qualify": DM_TIME_QUALIFY,
+        "startup": DM_STARTUP,
+        "timing": DM_TIMING,
+        "countdown_clock": DM_COUNTDOWN_CLOCK,
+        "countdown_warn": DM_COUNTDOWN_WARN,
+        "image": DM_IMAGE,
+        "playlist": DM_PLAYLIST,
+    }
+
+    # Commands taking an argument, defined in protocol.py
+
+    ARGUMENT_COMMANDS = ARGUMENT_COMMANDS
+
+    MODE_TEXTS = {
+        DM_TIME_LEFT_20_FULL: "20 min / 20 min / 20 min (heltimme)",
+        DM_TIME_LEFT_20_HALF: "20 min / 20 min / 20 min (halvtimme)",
+        DM_TIME_LEFT_25_35_FULL: "25 min / 35 min (heltimme)",
+        DM_TIME_LEFT_25_35_HALF: "25 min / 35 min (halvtimme)",
+        DM_TIME_LEFT: "30 min / 30 min",
+        DM_TIME: "Tidvisning",
+        DM_OFF: "Display avstängd",
+        DM_INFO_TEXT: "Infotext visad",
+        DM_WARNING_TEXT: "Varningstext visad",
+        DM_ONE_LAP: "1-varv",
+        DM_TWO_LAP: "2-varv",
+        DM_FINISH: "Målflagg",
+        DM_TIME_QUALIFY: "Kvalificering",
+        DM_STARTUP: "Uppstart",
+        DM_TIMING: "Tidtagning",
+        DM_COUNTDOWN_CLOCK: "Träningstid med klocka",
+        DM_COUNTDOWN_WARN: "Träningstid med varningstext",
+        DM_IMAGE: "Bild visad",
+        DM_PLAYLIST: "Spellista",
+    }
+
+    # Session end marks (minute, second) within the hour for each practice schedule
+
+    SESSION_ENDS = {
+        DM_TIME_LEFT: [(29, 59), (59, 59)],
+        DM_TIME_LEFT_20_FULL: [(19, 59), (39, 59), (59, 59)],
+        DM_TIME_LEFT_20_HALF: [(9, 59), (29, 59), (49, 59)],
+        DM_TIME_LEFT_25_35_FULL: [(24, 59), (59, 59)],
+        DM_TIME_LEFT_25_35_HALF: [(29, 59), (54, 59)],
+    }
+
+    # Modes drawn with a widget layout and the methods creating them
+
+    LAYOUT_MODES = {
+        DM_COUNTDOWN_CLOCK: "create_countdown_clock_layout",
+        DM_COUNTDOWN_WARN: "create_countdown_warn_layout",
+    }
+
+    FONTS = {
+        "font": "fonts/7x13.bdf",
+        "large_font": "fonts/9x18B.bdf",
+        "huge_font": "fonts/Bahnschrift_large.bdf",
+        "extra_large_font": "fonts/Bahnschrift.bdf",
+    }
+
+    MX_VERSION = "1.0.8"
+
+    def __init__(self, canvas, clock=None):
+        """Class constructor"""
+
+        if clock is None:
+            clock = SystemClock()
+
+        self.clock = clock
+        self.resolve_ip = get_ip
+        self.ip = None
+
+        self.debug_datetime = datetime(2020, 1, 1, 17, 24, 00)
+        self.debug = False
+
+        self._display_mode = StatusDisplay.DM_STARTUP
+        self.default_mode = StatusDisplay.DM_TIME_LEFT
+        self.canvas = canvas
+        self.compositor = Compositor(canvas.width, canvas.height)
+        self.animator = Animator(fps=50)
+        self.power = PowerManager()
+        self.heartbeat = Heartbeat()
+
+        self.transition = "wipe"
+        self.transition_time = 0.4
+        self._transition_from = None
+        self._last_frame = self.compositor.frame.copy()
+        self._loop_key = None
+
+        self.elapsed_time = 0.0
+        self.startup_delay = 60
+        self.startup_finished = False
+
+        self.timing_start = self.current_time()
+
+        # Fonts, geometry and layouts are created on first use, so the
+        # startup screen can be shown before they are loaded
+
+        self._fonts = {}
+        self._geometry = None
+        self._layouts = {}
+
+        self.time_color = (255, 255, 255)
+        self.time_warning_color = (255, 255, 0)
+        self.info_color = (255, 255, 255)
+        self.info_background = (0, 0, 140)
+        self.warn_color = (0, 0, 0)
+        self.warn_background = (200, 200, 0)
+        self.warn_border = (200, 0, 0)
+        self.time_over_color = (255, 0, 0)
+        self.training_back = (128, 0, 0)
+        self.training_bar = (0, 255, 0)      
+        self.training_text = (0, 0, 0)  
+        self.white = (230, 230, 230)
+        self.white_safe = (230, 230, 230)
+        self.black = (0, 0, 0)
+
+        self.hour_color = (255, 0, 0)    
+        self.minute_color = (0, 255, 0)
+        self.second_color = (0, 0, 255)
+
+        self.info_text = "Infotext"
+        self.warning_text = "Varningstext"
+
+        self.assets = AssetStore("assets", canvas.width, canvas.height)
+        self.image_name = None
+
+        self.playlist = Playlist()
+        self._page = None
+
+        self.session_mode = StatusDisplay.DM_TIME_LEFT_25_35_FULL
+
+        self._active_layout = None
+
+    def load_font(self, name):
+        """Return one of the FONTS, loading it on first use."""
+
+        font = self._fonts.get(name)
+
+        if font is None:
+            font = BdfFont(StatusDisplay.FONTS[name])
+            self._fonts[name] = font
+
+        return font
+
+    @property
+    def font(self):
+        return self.load_font("font")
+
+    @property
+    def large_font(self):
+        return self.load_font("large_font")
+
+    @property
+    def huge_font(self):
+        return self.load_font("huge_font")
+
+    @property
+    def extra_large_font(self):
+        return self.load_font("extra_large_font")
+
+    @property
+    def geometry(self):
+        """Panel geometry, computed when first needed."""
+
+        if self._geometry is None:
+            self._geometry = Geometry(self.canvas.width, self.canvas.height, [self.huge_font, self.extra_large_font, self.large_font, self.font])
+
+        return self._geometry
+
+    def layout(self, mode):
+        """Return the widget layout of a display mode or None if the mode
+        is not drawn with a layout. Layouts are created on first use."""
+
+        layout = self._layouts.get(mode)
+
+        if layout is None and mode in StatusDisplay.LAYOUT_MODES:
+            layout = getattr(self, StatusDisplay.LAYOUT_MODES[mode])()
+            self._layouts[mode] = layout
+
+        return layout
+
+    def create_countdown_clock_layout(self):
+        """Countdown with an analog clock to the right."""
+
+        g = self.geometry
+        font = g.fit_font("00:00", g.arrow_x, g.height)
+
+        layout = Layout(self.compositor.frame)
+        layout.add(CountdownWidget(0, 0, g.arrow_x, g.height, font, self.time_color, self.time_over_color, self.time_left))
+        layout.add(ClockWidget(g.arrow_x, g.arrow_y, g.arrow_size, g.arrow_size, self.time_color, self.hour_color, self.minute_color, self.second_color))
+        return layout
+
+    def create_countdown_warn_layout(self):
+        """Countdown and progress bar above a scrolling warning text."""
+
+        g = self.geometry
+        font = g.fit_font("00:00", g.status_countdown_width, g.status_height - 3)
+        bar_x = g.status_countdown_width + 4
+        bar_height = g.status_height // 2
+
+        layout = Layout(self.compositor.frame)
+        layout.add(CountdownWidget(0, 0, g.status_countdown_width, g.status_height, font, self.time_color, self.time_over_color, self.time_left))
+        layout.add(ProgressBarWidget(bar_x, (g.status_height - bar_height) // 2, g.width - bar_x - 4, bar_height, self.training_back, self.training_bar, self.session_progress))
+        layout.add(TickerWidget(0, g.status_height, g.width, g.ticker_height, g.small_font, self.warn_color, self.warn_background, lambda: self.warning_text))
+        return layout
+
+    def current_time(self):
+        if self.debug:
+            return self.debug_datetime
+        else: 
+            return self.clock.now()
+        
+    def time_left(self, now, mode=None):
+        """Return (seconds left, session length) of the current practice
+        session of a time left mode, by default the last selected one."""
+
+        if mode is None:
+            mode = self.session_mode
+
+        ends = sorted(m*60 + s for m, s in StatusDisplay.SESSION_ENDS[mode])
+        second = now.minute*60 + now.second
+
+        lengths = [(end - prev) % 3600 or 3600 for prev, end in zip(ends[-1:] + ends[:-1], ends)]
+        left = [(end - second) % 3600 for end in ends]
+
+        i = left.index(min(left))
+        return left[i], lengths[i]
+
+    def session_progress(self, now):
+        """Return the elapsed fraction of the current practice session."""
+
+        left, length = self.time_left(now)
+        return 1.0 - left / length
+
+    def draw_filled_rect(self, x0, y0, x1, y1, color):
+        """Draws a filled rectangle in the LED display"""
+
+        self.compositor.fill_rect(x0, y0, x1, y1, color)
+        
+    def draw_rect(self, x0, y0, x1, y1, color):
+        """Draw a rectangle in the LED display"""
+
+        self.compositor.rect(x0, y0, x1, y1, color)
+
+    def draw_placed(self, placement, color, text):
+        """Draw text at a precomputed placement"""
+
+        self.compositor.draw_text(placement.font, placement.x, placement.y, color, text)
+
+    def draw_border(self, color):
+        """Draw a double border around the display"""
+
+        g = self.geometry
+        self.draw_rect(0, 0, g.right, g.bottom, color)
+        self.draw_rect(1, 1, g.right-1, g.bottom-1, color)
+
+    def draw_time(self):
+        """Draw current time in the LED display"""
+
+        self.draw_border(self.time_color)
+        now = self.current_time()
+        time_str = now.strftime("%H:%M:%S")
+        self.draw_placed(self.geometry.time, self.time_color, time_str)
+
+    def draw_arrow_forward(self, color):
+
+        for x0, y0, x1, y1 in self.geometry.arrow_forward:
+            self.compositor.draw_line(x0, y0, x1, y1, color)
+        
+    def draw_arrow_right(self, color):
+
+        for x0, y0, x1, y1 in self.geometry.arrow_right:
+            self.compositor.draw_line(x0, y0, x1, y1, color)
+
+    def draw_session_countdown(self, mode):
+        """Draw time left in the practice session of a time left mode."""
+
+        now = self.current_time()
+        left, length = self.time_left(now, mode)
+        left_minutes, left_seconds = divmod(left, 60)
+        time_str = '{:02d}:{:02d}'.format(left_minutes, left_seconds)
+
+        if left_minutes > 1:
+            self.draw_placed(self.geometry.countdown, self.time_color, time_str)
+            self.draw_arrow_forward(self.time_color)
+        else:
+            if now.second % 2 == 0:
+                self.draw_placed(self.geometry.countdown, self.time_color, time_str)
+                self.draw_arrow_right(self.time_color)
+            else:
+                self.draw_placed(self.geometry.countdown, self.time_over_color, time_str)
+                self.draw_arrow_right(self.time_over_color)
+
+    def draw_half_hour(self):
+        """Draw time left in half-hour practice sessions."""
+
+        self.draw_session_countdown(StatusDisplay.DM_TIME_LEFT)
+
+    def draw_25_35_full(self):
+        """Draw time left in 25/35-minute practice sessions."""
+
+        self.draw_session_countdown(StatusDisplay.DM_TIME_LEFT_25_35_FULL)
+
+    def draw_25_35_half(self):
+        """Draw time left in 25/35-minute practice sessions."""
+
+        self.draw_session_countdown(StatusDisplay.DM_TIME_LEFT_25_35_HALF)
+
+    def draw_twenty_minutes_full(self):
+        """Draw time left in 20-minute practice sessions."""
+
+        self.draw_session_countdown(StatusDisplay.DM_TIME_LEFT_20_FULL)
+
+    def draw_twenty_minutes_half(self):
+        """Draw time left in 20-minute practice sessions."""
+
+        self.draw_session_countdown(StatusDisplay.DM_TIME_LEFT_20_HALF)
+
+    def draw_timing(self):
+        """Draw time since start of timing."""
+
+        now = self.current_time()
+
+        elapsed_time = now - self.timing_start
+
+        seconds = elapsed_time.total_seconds()
+        hours = seconds // 3600
+        minutes = (seconds % 3600) // 60
+        seconds = seconds % 60        
+                      
+        time_str = "%02i:%02i" % (minutes, seconds)
+
+        self.draw_placed(self.geometry.timing, self.time_color, time_str)
+
+    def draw_time_date(self):
+        """Draw time and date in the LED display."""
+
+        now = self.current_time()
+        time_str = now.strftime("%H:%M:%S")
+        date_str = now.strftime("%y-%m-%d")
+        g = self.geometry
+        self.compositor.draw_text(g.small_font, 0, g.small_line+1, self.time_color, time_str)
+        self.compositor.draw_text(g.small_font, 0, g.bottom, self.time_color, date_str)
+
+    def draw_info_text(self, text=None):
+        """Draw information text."""
+
+        if text is None:
+            text = self.info_text
+
+        g = self.geometry
+        self.compositor.fill(self.info_background)
+        self.draw_placed(g.place(text, 2, 2, g.width-2, g.height-2, align="left", margin=8), self.info_color, text)
+        self.draw_border(self.info_color)
+    
+    def draw_warn_text(self, text=None):
+        """Draw warning text"""
+
+        if text is None:
+            text = self.warning_text
+
+        g = self.geometry
+        self.compositor.fill(self.warn_background)
+        self.draw_placed(g.place(text, 2, 2, g.width-2, g.height-2, align="left", margin=8), self.warn_color, text)
+        self.draw_border(self.warn_border)
+
+    def set_ip(self, ip):
+        """Update the IP address shown on the startup screen."""
+
+        print("IP address:", ip)
+        self.ip = ip
+
+    def draw_startup(self):
+        """Draw startup screen with ip and version. Only the small font is
+        used, so the screen does not wait for the other fonts."""
+
+        if self.ip is None:
+            self.ip = self.resolve_ip()
+
+        font = self.font
+        line = font.ink_extent(DIGITS)[2] + 2
+        self.compositor.draw_text(font, 4, line, self.time_color, self.ip+":5000")
+        self.compositor.draw_text(font, 4, self.canvas.height-2, self.time_color, "mxdisplay-"+self.MX_VERSION)
+
+    def draw_image(self, name=None):
+        """Draw the current image from the asset store."""
+
+        if name is None:
+            name = self.image_name
+
+        image = self.assets.get(name)
+
+        if image is not None:
+            self.compositor.blit(image)
+        else:
+            g = self.geometry
+            self.draw_placed(g.place("Bild saknas", 0, 0, g.width, g.height), self.time_over_color, "Bild saknas")
+
+    def render_page(self, page):
+        """Render a playlist page and return a copy of its frame."""
+
+        self.compositor.clear()
+
+        if page.mode == "info":
+            self.draw_info_text(page.text)
+        elif page.mode == "warn":
+            self.draw_warn_text(page.text)
+        elif page.mode == "image":
+            self.draw_image(page.text)
+        elif page.mode == "one_lap":
+            self.draw_lap_left(1)
+        elif page.mode == "two_lap":
+            self.draw_lap_left(2)
+        elif page.mode == "qualify":
+            self.draw_time_qualify()
+
+        return self.compositor.frame.copy()
+
+    def draw_playlist(self):
+        """Draw the current playlist page from its cached frame, starting
+        a transition when the page changes."""
+
+        page = self.playlist.page(self.clock.monotonic())
+
+        if page is None:
+            g = self.geometry
+            self.draw_placed(g.place("Tom spellista", 0, 0, g.width, g.height), self.time_color, "Tom spellista")
+            return
+
+        if page is not self._page:
+            if self._page is not None and self.transition is not None:
+                self._transition_from = (self._display_mode, self._last_frame.copy())
+            self._page = page
+
+        self.compositor.blit(self.playlist.frame(page, self.render_page))
+
+    def draw_lap_left(self, laps_left):
+        """Draw laps left sign"""
+
+        g = self.geometry
+        text = str(laps_left)+" VARV"
+        self.compositor.fill(self.white_safe)
+        self.draw_placed(g.place(text, 0, 0, g.width, g.height), self.black, text)
+
+    def draw_time_qualify(self):
+        """Draw time qualify in sign"""
+
+        g = self.geometry
+        self.draw_placed(g.place("Tidskval", 0, 0, g.width, g.height), self.white, "Tidskval")
+
+    def draw_finish(self, invert=False):
+        """Draw finish flag"""
+
+        self.compositor.checkered(8, invert, self.white)
+
+    def draw(self):
+        """Main draw routine of the display. While a looping animation of
+        unchanged content is playing the frame is not composed again."""
+
+        if self.loop_unchanged():
+            frame = self.animator.frame(self.clock.monotonic())
+        else:
+            self.compose()
+            frame = self.animate(self.compositor.frame)
+
+        self.canvas.brightness = self.power.update(self.current_time(), frame)
+        self.compositor.show(self.canvas, frame)
+        self._last_frame = frame
+
+    def compose(self):
+        """Draw the current display mode into the compositor frame."""
+
+        layout = self.layout(self._display_mode)
+
+        if layout is not None:
+            self.draw_layout(layout)
+        else:
+            self._active_layout = None
+            self.compositor.clear()
+
+        if self._display_mode == StatusDisplay.DM_TIME_LEFT:
+            self.draw_half_hour()
+        elif self._display_mode == StatusDisplay.DM_TIME_LEFT_20_FULL:
+            self.draw_twenty_minutes_full()
+        elif self._display_mode == StatusDisplay.DM_TIME_LEFT_20_HALF:
+            self.draw_twenty_minutes_half()
+        elif self._display_mode == StatusDisplay.DM_TIME_LEFT_25_35_FULL:
+            self.draw_25_35_full()
+        elif self._display_mode == StatusDisplay.DM_TIME_LEFT_25_35_HALF:
+            self.draw_25_35_half()
+        elif self._display_mode == StatusDisplay.DM_CLOSED:
+            pass
+        elif self._display_mode == StatusDisplay.DM_TIME:
+            self.draw_time()
+        elif self._display_mode == StatusDisplay.DM_INFO_TEXT:
+            self.draw_info_text()
+        elif self._display_mode == StatusDisplay.DM_WARNING_TEXT:
+            self.draw_warn_text()
+        elif self._display_mode == StatusDisplay.DM_STARTUP:
+            self.draw_startup()
+        elif self._display_mode == StatusDisplay.DM_OFF:
+            pass
+        elif self._display_mode == StatusDisplay.DM_ONE_LAP:
+            self.draw_lap_left(1)
+        elif self._display_mode == StatusDisplay.DM_TWO_LAP:
+            self.draw_lap_left(2)
+        elif self._display_mode == StatusDisplay.DM_FINISH:
+            now = self.current_time()
+            if now.second % 2 == 0:
+                self.draw_finish(True)
+            else:
+                self.draw_finish(False)
+        elif self._display_mode == StatusDisplay.DM_TIME_QUALIFY:
+            self.draw_time_qualify()
+        elif self._display_mode == StatusDisplay.DM_TIMING:
+            self.draw_timing()
+        elif self._display_mode == StatusDisplay.DM_IMAGE:
+            self.draw_image()
+        elif self._display_mode == StatusDisplay.DM_PLAYLIST:
+            self.draw_playlist()
+
+    def draw_layout(self, layout):
+        """Update a layout, redrawing only the regions that changed."""
+
+        if layout is not self._active_layout:
+            self.compositor.clear()
+            layout.invalidate()
+            self._active_layout = layout
+
+        layout.update(self.clock.monotonic(), self.current_time())
+
+    def animate(self, frame):
+        """Return the frame to show, replacing it with a transition or
+        looping animation frame when one is playing."""
+
+        now = self.clock.monotonic()
+
+        if self._transition_from is not None:
+            from_mode, from_frame = self._transition_from
+            self._transition_from = None
+            key = (from_mode, self._display_mode, hash(from_frame.tobytes()), hash(frame.tobytes()))
+            self.animator.play(self.animator.transition(key, from_frame, frame, self.transition, self.transition_time), now)
+        elif self.animator.animation is None or self.animator.animation.loop:
+            key = self.loop_key()
+            if key is None:
+                self.animator.stop()
+            elif self._display_mode == StatusDisplay.DM_FINISH:
+                self.animator.play(self.animator.waving(key, frame), now)
+            else:
+                self.animator.play(self.animator.pulsing(key, frame), now)
+            self._loop_key = key
+
+        animated = self.animator.frame(now)
+
+        if animated is None:
+            return frame
+        else:
+            return animated
+
+    def loop_key(self):
+        """Key identifying the content of the looping animation of the
+        current mode, or None if the mode is not animated."""
+
+        if self._display_mode == StatusDisplay.DM_FINISH:
+            return (self._display_mode, self.current_time().second % 2 == 0)
+        elif self._display_mode == StatusDisplay.DM_WARNING_TEXT:
+            return (self._display_mode, self.warning_text)
+        else:
+            return None
+
+    def loop_unchanged(self):
+        """True if a looping animation is playing and its content has not
+        changed, so the frame does not have to be composed."""
+
+        animation = self.animator.animation
+
+        return (self._transition_from is None and animation is not None and animation.loop
+            and self._loop_key is not None and self.loop_key() == self._loop_key)
+
+    def frame_interval(self):
+        """Time between frames, shorter while an animation is playing."""
+
+        if self.animator.active:
+            return 1.0 / self.animator.fps
+        elif self._active_layout is not None:
+            return min(self._active_layout.interval, 0.1)
+        else:
+            return 0.1
+
+    def update(self, dt):
+        """Advance the elapsed time by dt seconds."""
+
+        self.elapsed_time += dt
+
+        # Check if startup delay is completed and switch
+        # to default mode
+
+        if (self.elapsed_time > self.startup_delay) and not self.startup_finished:
+            self.startup_finished = True 
+            now = self.current_time()
+            if (now.hour>16):
+                self.display_mode = StatusDisplay.DM_TIME_LEFT_25_35_HALF
+            else:
+                self.display_mode = StatusDisplay.DM_TIME_LEFT_25_35_FULL
+
+    def execute(self, message, argument=None, immediate=False):
+        """Execute a control command. Returns the reply to the client.
+        With immediate the new mode is shown without a transition."""
+
+        reply = None
+
+        self.startup_finished = True
+
+        if message in StatusDisplay.COMMAND_MODES:
+            print("Switching to", message)
+            self.display_mode = StatusDisplay.COMMAND_MODES[message]
+        elif message == "set_info_text":
+            print("Text received: ", argument)
+            self.info_text = argument or ""
+            self.display_mode = StatusDisplay.DM_INFO_TEXT
+        elif message == "set_warn_text":
+            print("Text received: ", argument)
+            self.warning_text = argument or ""
+            self.display_mode = StatusDisplay.DM_WARNING_TEXT
+        elif message == "show_image":
+            print("Image received: ", argument)
+            self.image_name = argument
+            self.assets.invalidate(argument)
+            self.playlist.invalidate()
+            self.display_mode = StatusDisplay.DM_IMAGE
+        elif message == "set_playlist":
+            print("Playlist received: ", argument)
+            try:
+                self.playlist.set_pages(loads_pages(argument or ""))
+                self.display_mode = StatusDisplay.DM_PLAYLIST
+            except ValueError as e:
+                print("Invalid playlist:", e)
+        elif message == "panel_size":
+            reply = "OK,%dx%d" % (self.canvas.width, self.canvas.height)
+        elif message == "reset_timing":
+            print("Resetting timing")
+            self.reset_timing()
+            self.display_mode = StatusDisplay.DM_TIMING
+        elif message == "set_brightness":
+            print("Brightness received: ", argument)
+            try:
+                self.power.set_brightness(int(argument))
+            except (TypeError, ValueError):
+                pass
+        elif message == "auto_brightness":
+            print("Switching to automatic brightness")
+            self.power.set_auto()
+        elif message == "power":
+            print("Sending power status")
+            reply = "OK,Ljusstyrka %d%% (%s) / %.1f A" % (self.power.brightness, "auto" if self.power.auto else "manuell", self.power.current)
+        elif message == "health":
+            health = self.heartbeat.status()
+            health["mode"] = self.mode_text
+            reply = "OK,%s" % json.dumps(health)
+        elif message == "status":
+            print("Sending status")
+
+        if immediate:
+            self._transition_from = None
+            if self.animator.animation is not None and not self.animator.animation.loop:
+                self.animator.stop()
+
+        if reply is None:
+            reply = "OK,%s" % (self.mode_text)
+
+        return reply
+
+    def reset_timing(self):
+        """Reset timing to zero."""
+
+        self.timing_start = self.current_time()
+
+    def set_display_mode(self, mode):
+        """Display mode setter"""
+
+        if mode in StatusDisplay.SESSION_ENDS:
+            self.session_mode = mode
+
+        if mode != self._display_mode and self.transition is not None:
+            self._transition_from = (self._display_mode, self._last_frame.copy())
+
+        self._display_mode = mode
+
+    def get_display_mode(self):
+        """Display mode getter"""
+        return self._display_mode
+
+    display_mode = property(get_display_mode, set_display_mode)
+
+    @property
+    def mode_text(self):
+        """Description of the display mode shown in the web interface"""
+
+        return StatusDisplay.MODE_TEXTS.get(self._display_mode, "")